@@ -1,4 +1,23 @@
-from .ui.logging import LogLevel, LogEntry, Logger, LoggerInstance
-from .manager import known_peers, posts, dms
+import importlib
+
+# Exports are resolved on first access (PEP 562) so importing any submodule of `src`
+# does not drag in the logger, the controller, sockets and zeroconf up front.
+_LAZY_EXPORTS = {
+  "LogLevel": ("src.ui.logging", "LogLevel"),
+  "LogEntry": ("src.ui.logging", "LogEntry"),
+  "Logger": ("src.ui.logging", "Logger"),
+  "LoggerInstance": ("src.ui.logging", "LoggerInstance"),
+  "known_peers": ("src.manager.state", "known_peers"),
+  "posts": ("src.manager.state", "posts"),
+  "dms": ("src.manager.state", "dms"),
+}
+
+def __getattr__(name: str):
+  if name not in _LAZY_EXPORTS:
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+  module_name, attr = _LAZY_EXPORTS[name]
+  value = getattr(importlib.import_module(module_name), attr)
+  globals()[name] = value
+  return value
 
 __all__ = ["LogLevel", "LogEntry", "Logger", "LoggerInstance", "known_peers", "posts", "dms"]
\ No newline at end of file
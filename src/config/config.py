@@ -1,11 +1,11 @@
-
+from typing import Final
 
 # --- Constants ---
-LSNP_PORT = 50999
-BUFFER_SIZE = 4096
-MDNS_SERVICE_TYPE = "_lsnp._udp.local."
-RETRY_COUNT = 3
-RETRY_INTERVAL = 2.0    # seconds
+LSNP_PORT: Final[int] = 50999
+BUFFER_SIZE: Final[int] = 4096
+MDNS_SERVICE_TYPE: Final[str] = "_lsnp._udp.local."
+RETRY_COUNT: Final[int] = 3
+RETRY_INTERVAL: Final[float] = 2.0    # seconds
 
 # Tokens
-TOKEN_TTL = 600         # seconds
\ No newline at end of file
+TOKEN_TTL: Final[int] = 600         # seconds
\ No newline at end of file
@@ -1,3 +1,3 @@
-from .tictactoe import GameManager
+from .tictactoe import GameManager, TicTacToeGame, TTT_EMPTY_CELL
 
-__all__ = ["GameManager"]
\ No newline at end of file
+__all__ = ["GameManager", "TicTacToeGame", "TTT_EMPTY_CELL"]
\ No newline at end of file
@@ -1,26 +1,75 @@
 from src.ui.logging import LoggerInstance
 
+TTT_EMPTY_CELL = ord(" ")
+
+_TTT_WINS: tuple[tuple[int, int, int], ...] = (
+    (0,1,2), (3,4,5), (6,7,8),  # rows
+    (0,3,6), (1,4,7), (2,5,8),  # cols
+    (0,4,8), (2,4,6)            # diagonals
+)
+
+# Same lines as 9-bit occupancy masks (bit i set = cell i taken)
+_TTT_WIN_MASKS: dict[int, tuple[int, int, int]] = {
+    (1 << a) | (1 << b) | (1 << c): (a, b, c) for a, b, c in _TTT_WINS
+}
+_TTT_FULL_MASK = 0b111111111
+
+# For each cell, only the (mask, line) pairs that pass through it; a move can only complete one of these
+_TTT_LINES_THROUGH: tuple[tuple[tuple[int, tuple[int, int, int]], ...], ...] = tuple(
+    tuple((mask, line) for mask, line in _TTT_WIN_MASKS.items() if position in line)
+    for position in range(9)
+)
+
+class TicTacToeGame:
+  """
+  State of a single tic-tac-toe session against one opponent.
+  """
+  __slots__ = ("gameid", "board", "x_mask", "o_mask", "my_symbol", "opponent", "turn", "active",
+               "move_template", "move_template_token")
+
+  def __init__(self, gameid: str, my_symbol: str, opponent: str):
+    self.gameid: str = gameid
+    self.board: bytearray = bytearray(b" " * 9)   # One ASCII byte per cell: " ", "X" or "O"
+    self.x_mask: int = 0                           # Bit i set = cell i taken by X
+    self.o_mask: int = 0
+    self.my_symbol: str = my_symbol
+    self.opponent: str = opponent
+    self.turn: int = 0
+    self.active: bool = True
+    self.move_template: bytes = b""
+    self.move_template_token: str = ""
+
 class GameManager:
   def __init__(self, logger: "LoggerInstance"):
       self.logger = logger
       
-  def _print_ttt_board(self, board):
-    self.logger.info("\n")
-    for i in range(0, 9, 3):
-      self.logger.info(f" {board[i]} | {board[i+1]} | {board[i+2]} ")
-      if i < 6:
-        self.logger.info("---+---+---")
-    self.logger.info("\n")
-
-  def _check_ttt_winner(self, board):
-      wins = [
-          (0,1,2), (3,4,5), (6,7,8),  # rows
-          (0,3,6), (1,4,7), (2,5,8),  # cols
-          (0,4,8), (2,4,6)            # diagonals
-      ]
-      for a,b,c in wins:
-          if board[a] != " " and board[a] == board[b] == board[c]:
-              return board[a], (a,b,c)
-      if " " not in board:
+  def _mark_ttt_move(self, game: TicTacToeGame, position: int, symbol: str) -> None:
+    """Writes a move to the game's board and the player's occupancy mask."""
+    game.board[position] = ord(symbol)
+    if symbol == "X":
+      game.x_mask |= 1 << position
+    else:
+      game.o_mask |= 1 << position
+
+  def _print_ttt_board(self, board: bytearray):
+    cells = board.decode("ascii")
+    self.logger.info("\n".join([
+      "\n",
+      f" {cells[0]} | {cells[1]} | {cells[2]} ",
+      "---+---+---",
+      f" {cells[3]} | {cells[4]} | {cells[5]} ",
+      "---+---+---",
+      f" {cells[6]} | {cells[7]} | {cells[8]} ",
+      "\n",
+    ]))
+
+  def _check_ttt_winner_after_move(self, game: TicTacToeGame, position: int):
+      """Checks only the 2-4 lines through the cell that was just played."""
+      symbol = chr(game.board[position])
+      mask = game.x_mask if symbol == "X" else game.o_mask
+      for line_mask, line in _TTT_LINES_THROUGH[position]:
+          if mask & line_mask == line_mask:
+              return symbol, line
+      if game.x_mask | game.o_mask == _TTT_FULL_MASK:
           return "DRAW", None
       return None, None
@@ -1,5 +1,20 @@
-from .main import main
-from .state import known_peers, posts, dms
-from .lsnp_controller import LSNPController
+import importlib
+
+# Resolved on first access (PEP 562); see src/__init__.py
+_LAZY_EXPORTS = {
+  "main": ("src.manager.main", "main"),
+  "LSNPController": ("src.manager.lsnp_controller", "LSNPController"),
+  "known_peers": ("src.manager.state", "known_peers"),
+  "posts": ("src.manager.state", "posts"),
+  "dms": ("src.manager.state", "dms"),
+}
+
+def __getattr__(name: str):
+  if name not in _LAZY_EXPORTS:
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+  module_name, attr = _LAZY_EXPORTS[name]
+  value = getattr(importlib.import_module(module_name), attr)
+  globals()[name] = value
+  return value
 
 __all__ = ["main", "LSNPController", "known_peers", "posts", "dms"]
\ No newline at end of file
@@ -1,13 +1,18 @@
+import asyncio
+import heapq
 import socket
 import threading
 import time
 import json
 import uuid
-import base64
 import os
 import math
 import shlex
-from typing import Dict, List, Callable, Tuple, Optional, Set
+from bisect import bisect_left
+from itertools import islice
+from operator import itemgetter
+from secrets import token_hex
+from typing import Dict, Iterator, List, Callable, Tuple, Optional, Set
 from zeroconf import Zeroconf, ServiceInfo, ServiceBrowser, ServiceListener
 from src.protocol.types.messages.message_formats import *
 from src.ui import logging
@@ -17,6 +22,16 @@ from src.utils import *
 from src.network import *
 from src.game import *
 
+try:
+    from pybase64 import b64encode, b64decode     # Optional: SIMD base64 codec, much faster on file chunks
+except ImportError:
+    from base64 import b64encode, b64decode
+
+try:
+    import readline     # Tab completion for the REPL; absent on Windows
+except ImportError:
+    readline = None
+
 import src.manager.state as state
 
 logger = logging.Logger()
@@ -28,8 +43,110 @@ LSNP_PREFIX = f'[green][{LSNP_CODENAME}][/]'
 
 LSNP_BROADCAST_PERIOD_SECONDS = 300
 MAX_CHUNK_SIZE = 1024  # Maximum chunk size in bytes
+FILE_SEND_BATCH_CHUNKS = 16   # FILE_CHUNK datagrams handed to the kernel per sendmmsg call
+FILE_SEND_RATE_BYTES_PER_SECOND = 256 * 1024   # Pace between batches so the receiver's socket buffer keeps up
+FILE_RESPONSE_TIMEOUT_SECONDS = 60   # How long an offer waits for FILE_ACCEPT/FILE_REJECT
+TRANSFER_MAX_AGE_SECONDS = 24 * 60 * 60  # Offers and transfers still unfinished after this are dropped
+TRANSFER_CLEANUP_PERIOD_SECONDS = 60 * 60
+FILE_PROGRESS_LOG_INTERVAL_SECONDS = 0.05  # Verbose chunk progress is coalesced to at most one line per interval
+TOKEN_REFRESH_MARGIN_SECONDS = 30   # Reissue a cached token this long before it expires
+MIME_TYPES = {
+    'txt': 'text/plain',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+    'gif': 'image/gif',
+    'pdf': 'application/pdf',
+    'mp3': 'audio/mpeg',
+    'mp4': 'video/mp4',
+    'zip': 'application/zip'
+}
+
+HELP_STR = ("\nCommands:\n"
+  "  peers                                        - List discovered peers\n"
+  "  dms                                          - Show inbox\n"
+  "  dm <user> <msg>                              - Send direct message\n"
+  "  post <msg>                                   - Create a new post to followers\n"
+  "  follow <user>                                - Follow a user\n"
+  "  unfollow <user>                              - Unfollow a user\n"
+  "  sendfile <user> <filepath> [description]                 - Send a file\n"
+  "  acceptfile <fileid>                          - Accept a pending file offer\n"
+  "  rejectfile <fileid>                          - Reject a pending file offer\n"
+  "  pendingfiles                                 - List pending file offers\n"
+  "  transfers                                    - List active file transfers\n"
+  "  broadcast                                    - Send profile broadcast\n"
+  "  ttl <seconds>                                - Set TTL for posts (default: 60)\n"
+  "  game list                                    - List active Tic Tac Toe games\n"
+  "  game invite <user> <X|O>                     - Invite to Tic Tac Toe game\n"
+  "  game move <gameid> <position 0-8>            - Make a move in Tic Tac Toe\n"
+  "  game forfeit <gameid>                        - Forfeit a Tic Tac Toe game\n"
+  "  group list <name>                            - Show details of a group\n"
+  "  group create <name> <users>                  - Creates a group with one or more users\n"
+  "  group add <name> <user>                      - Adds a user to the group\n"
+  "  group remove <name> <user>                   - Removes a user from the group\n"
+  "  group message <name> <message>               - Sends a message to the group\n"
+  "  Note: Group names and messages must be enclosed in quotation marks.\n"
+  "  Note: Users must be separated by comma.\n"
+  "  ping                                         - Send ping\n"
+  "  verbose                                      - Toggle verbose mode\n"
+  "  ipstats                                      - Show IP statistics\n"
+  "  quit                                         - Exit")
+
+GROUP_HELP_STR = ("\nCommands:\n"
+  "  group list <name>              - Show details of a group\n"
+  "  group create <name> <users>    - Creates a group with one or more users\n"
+  "  group add <name> <user>        - Adds a user to the group\n"
+  "  group remove <name> <user>     - Removes a user from the group\n"
+  "  group message <name> <message> - Sends a message to the group\n"
+  "  Note: Group names and messages must be enclosed in quotation marks.\n"
+  "  Note: Users must be separated by comma.")
+
+# Sorted so completion can binary-search to the first phrase sharing the typed prefix
+COMMAND_PHRASES = tuple(sorted((
+  "help", "peers", "dms", "dm", "post", "like", "ttl", "follow", "unfollow",
+  "sendfile", "acceptfile", "rejectfile", "pendingfiles", "transfers", "broadcast",
+  "group help", "group lists", "group list", "group create", "group add", "group remove", "group message",
+  "game list", "game invite", "game move", "game forfeit",
+  "ping", "verbose", "ipstats", "quit",
+)))
+
+def complete_command(line: str) -> List[str]:
+    """Returns every command phrase starting with `line`, in sorted order"""
+    matches = []
+    for i in range(bisect_left(COMMAND_PHRASES, line), len(COMMAND_PHRASES)):
+        if not COMMAND_PHRASES[i].startswith(line):
+            break
+        matches.append(COMMAND_PHRASES[i])
+    return matches
+
+# Bound once so the per-move game senders skip the module attribute lookup
+_time = time.time
+
+# Whole FILE_CHUNK frame; send_file encodes the per-transfer fields once and only the counters vary per chunk
+_FILE_CHUNK_TEMPLATE = (b"TYPE: FILE_CHUNK\n"
+                        b"FROM: %b\n"
+                        b"TO: %b\n"
+                        b"FILEID: %b\n"
+                        b"CHUNK_INDEX: %d\n"
+                        b"TOTAL_CHUNKS: %d\n"
+                        b"CHUNK_SIZE: %d\n"
+                        b"TOKEN: %b\n"
+                        b"DATA: %b\n")
+
+# Pulls every FILE_CHUNK field the receive path needs in one C-level call instead of one kv.get each
+_get_file_chunk_fields = itemgetter("FROM", "TO", "FILEID", "TOKEN", "CHUNK_INDEX", "DATA")
+
+def iter_file_chunks(file_path: str) -> Iterator[bytes]:
+    """Yield a file MAX_CHUNK_SIZE bytes at a time, so only one chunk is in memory while sending"""
+    with open(file_path, 'rb') as f:
+        while chunk := f.read(MAX_CHUNK_SIZE):
+            yield chunk
 
 class FileTransfer:
+    __slots__ = ("file_id", "filename", "filesize", "filetype", "total_chunks", "sender_id",
+                 "description", "chunks", "received_chunks", "accepted", "completed", "timestamp",
+                 "last_progress_log", "last_progress_pct", "token", "token_valid_until")
+
     def __init__(self, file_id: str, filename: str, filesize: int, filetype: str, 
                  total_chunks: int, sender_id: str, description: str = ""):
         self.file_id = file_id
@@ -44,6 +161,10 @@ class FileTransfer:
         self.accepted = False
         self.completed = False
         self.timestamp = int(time.time())
+        self.last_progress_log = 0.0   # time.monotonic() of the last verbose progress line
+        self.last_progress_pct = -1    # Whole percent shown by that line
+        self.token = ""                # Last chunk token that validated, and until when it stays valid
+        self.token_valid_until = 0
         
 
     def add_chunk(self, chunk_index: int, data: bytes) -> bool:
@@ -63,16 +184,20 @@ class FileTransfer:
         if not self.completed:
             return None
         
-        assembled = b''
-        for i in range(self.total_chunks):
-            if i not in self.chunks:
-                return None
-            assembled += self.chunks[i]
+        chunks = self.chunks
+        if len(chunks) != self.total_chunks:
+            return None
         
-        return assembled
+        # One join allocates the file once; += recopied everything received so far for each chunk
+        try:
+            return b''.join([chunks[i] for i in range(self.total_chunks)])
+        except KeyError:
+            return None
 
 
 class Group:
+    __slots__ = ("group_id", "group_name", "owner_id", "members", "created_at")
+
     def __init__(self, group_id: str, group_name: str, owner_id: str, members: List[str]):
         self.group_id: str = group_id
         self.group_name: str = group_name
@@ -86,37 +211,97 @@ class LSNPController:
       self.display_name = display_name
       self.port = port
       self.avatar_path = avatar_path
+      self.avatar = load_avatar(avatar_path)   # (MIME type, base64), read once for every PROFILE broadcast
       self.verbose = verbose
       self.ip = self._get_own_ip()
+      self.broadcast_addr = self.ip.rsplit('.', 1)[0] + '.255'
       self.full_user_id = f"{self.user_id}@{self.ip}"
+      self.full_user_id_bytes = self.full_user_id.encode()   # Spliced into bytes templates without re-encoding
       self.peer_map: Dict[str, Peer] = {}
+      self.peer_map_by_shortname: Dict[str, str] = {}   # "user" -> "user@ip"
+      self.peer_map_by_display_name: Dict[str, str] = {}   # "Alice" -> "user@ip"
       self.inbox: List[str] = []
       
       self.groups: List[Group] = []
-      self.followers: List[str] = []
-      self.ack_events: Dict[str, threading.Event] = {}
-      self.project_root = self._get_project_root()
+      self.followers: Set[str] = set()
+      self.ack_events: Dict[str, asyncio.Future] = {}   # message_id -> future resolved by its ACK
+      self.ack_released: Dict[str, asyncio.Future] = {}   # message_id -> future resolved once its send stops waiting
+      self.session_tokens: Dict[str, Tuple[str, int]] = {}   # scope -> (token, expiry)
+      self.project_root = self._get_project_root()   # Walks up the tree, so it is resolved once here
+      self.downloads_dir = os.path.join(self.project_root, "lsnp_data", self.full_user_id, "downloads")
       
       # File transfer management
       self.active_transfers: Dict[str, FileTransfer] = {}
       self.pending_offers: Dict[str, FileTransfer] = {}
+      self.transfer_expiry: List[Tuple[int, str]] = []   # Min-heap of (expiry, file_id) for incoming transfers
+      self.transfer_expiry_lock = threading.Lock()   # Pushed by the listener, popped by the cleanup thread
+      self.stop_event = threading.Event()   # Set on quit so background loops exit promptly
 
-      self.file_response_events: Dict[str, threading.Event] = {}
-      self.file_responses: Dict[str, str] = {}
+      self.file_responses: Dict[str, asyncio.Future] = {}   # file_id -> future resolved with "ACCEPTED"/"REJECTED"
 
       self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
       self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1) # Enables broadcasting
       self.socket.bind(("", self.port))
+      self.tx_queue = UDPBatchSender(self.socket)
+      self.tx_flush_pending = False   # Only touched on the ACK loop
       self.following: Set[str] = set()      # Who we are following
       self.post_likes: Set[str] = set()
+      self.pending_likes: Set[str] = set()   # Posts with a LIKE/UNLIKE still awaiting its ACK
       self.zeroconf = Zeroconf()
       self._register_mdns()
       self._start_threads()
       
-      self.tictactoe_games = {}  
+      self.tictactoe_games: Dict[str, TicTacToeGame] = {}
+      self.next_game_seq = 0
       self.lsnp_logger = logger.get_logger(user_id)
       self.gamemanager = GameManager(self.lsnp_logger)
-      self.ip_tracker = IPAddressTracker()
+      self.ip_tracker = IPAddressTracker(self.verbose)
+      # REPL verb -> handler taking the rest of the line, built once so run() dispatches with one lookup
+      self.commands: Dict[str, Callable[[str], None]] = {
+          "help": self._cmd_help,
+          "peers": lambda args: self.list_peers(),
+          "dms": lambda args: self.show_inbox(),
+          "dm": self._cmd_dm,
+          "post": self._cmd_post,
+          "like": self._cmd_like,
+          "ttl": self._cmd_ttl,
+          "follow": self._cmd_follow,
+          "unfollow": self._cmd_unfollow,
+          "sendfile": self._cmd_sendfile,
+          "acceptfile": self._cmd_acceptfile,
+          "rejectfile": self._cmd_rejectfile,
+          "pendingfiles": lambda args: self.list_pending_files(),
+          "transfers": lambda args: self.list_active_transfers(),
+          "broadcast": lambda args: self.broadcast_profile(),
+          "group": self._cmd_group,
+          "game": self._cmd_game,
+          "ping": lambda args: self.send_ping(),
+          "verbose": self._cmd_verbose,
+          "ipstats": lambda args: self.show_ip_stats(),
+      }
+      # Message TYPE -> handler, so each inbound packet is dispatched with one dict lookup
+      self.kv_handlers: Dict[str, Callable[[dict, Tuple[str, int]], None]] = {
+          "PROFILE": self._handle_profile,
+          "DM": self._handle_dm,
+          "FOLLOW": self._handle_follow,
+          "UNFOLLOW": self._handle_unfollow,
+          "POST": self._handle_post,
+          "FILE_OFFER": self._handle_file_offer,
+          "FILE_CHUNK": self._handle_file_chunk,
+          "FILE_RECEIVED": self._handle_file_received,
+          "ACK": self._handle_ack,
+          "PING": self._handle_ping,
+          "FILE_ACCEPT": self._handle_file_accept,
+          "FILE_REJECT": self._handle_file_reject,
+          "LIKE": self._handle_like,
+          "TICTACTOE_INVITE": self._handle_tictactoe_invite,
+          "TICTACTOE_MOVE": self._handle_tictactoe_move,
+          "TICTACTOE_RESULT": self._handle_tictactoe_result,
+          "GROUP_CREATE": self._handle_group_create,
+          "GROUP_ADD": self._handle_group_add,
+          "GROUP_REMOVE": self._handle_group_remove,
+          "GROUP_MESSAGE": self._handle_group_message,
+      }
 
       if self.verbose:
           self.lsnp_logger.info(f"[INIT] Peer initialized: {self.full_user_id}")
@@ -167,39 +352,52 @@ class LSNPController:
         self.lsnp_logger.info(f"[mDNS] Registered: {info.name}")
 
     def _start_threads(self):
+      # One event loop owns every pending ACK wait, so retransmits of many messages overlap on one thread
+      self.ack_loop = asyncio.new_event_loop()
+      threading.Thread(target=self.ack_loop.run_forever, daemon=True).start()
       threading.Thread(target=self._listen, daemon=True).start()
+      threading.Thread(target=self._cleanup_loop, daemon=True).start()
       listener = PeerListener(self.peer_map, self._on_peer_discovered)
       ServiceBrowser(self.zeroconf, MDNS_SERVICE_TYPE, listener)
       if self.verbose:
         self.lsnp_logger.info("[mDNS] Discovery started")
 
     def _listen(self):
+        receiver = UDPBatchReceiver(self.socket, BUFFER_SIZE)
         while True:
             try:
-                data: bytes
-                addr: Tuple[str, int]
-                data, addr = self.socket.recvfrom(BUFFER_SIZE)
-                sender_ip, sender_port = addr
-    
-                self.ip_tracker.log_connection_attempt(sender_ip, sender_port, success=True)
-                raw = data.decode()
-                data_size = len(data)
+                batch = receiver.recv()
+            except OSError as e:
                 if self.verbose:
-                  self.lsnp_logger.info(f"[RECV] From {addr}: \n{raw[:100]}{'...' if len(raw) > 100 else ''}")
-                
-                # All messages should be in key-value format now
-                if "TYPE: " in raw:
-                    kv = parse_kv_message(raw)
-                    self._handle_kv_message(kv, addr)
-                    self.ip_tracker.log_message_flow(sender_ip, self.ip, kv.get("TYPE", "UNKNOWN"), data_size)
-                else:
-                    # Fallback for any legacy JSON messages
-                    msg = json.loads(raw)
-                    self._handle_json_message(msg, addr)
-                    self.ip_tracker.log_message_flow(sender_ip, self.ip, msg.get("type", "JSON"), data_size)
-            except Exception as e:
-                if self.verbose:
-                    self.lsnp_logger.info(f"[ERROR] Malformed message from {addr}: {e}")
+                    self.lsnp_logger.info(f"[ERROR] Receive failed: {e}")
+                continue
+            for data, addr in batch:
+                self._receive(data, addr)
+
+    def _receive(self, data: bytes, addr: Tuple[str, int]):
+        """Handle one received datagram; a malformed one is logged and dropped"""
+        try:
+            sender_ip, sender_port = addr
+
+            self.ip_tracker.log_connection_attempt(sender_ip, sender_port, success=True)
+            raw = data.decode()
+            data_size = len(data)
+            if self.verbose:
+              self.lsnp_logger.info(f"[RECV] From {addr}: \n{raw[:100]}{'...' if len(raw) > 100 else ''}")
+            
+            # All messages should be in key-value format now
+            if "TYPE: " in raw:
+                kv = parse_kv_message(raw)
+                self._handle_kv_message(kv, addr)
+                self.ip_tracker.log_message_flow(sender_ip, self.ip, kv.get("TYPE", "UNKNOWN"), data_size)
+            else:
+                # Fallback for any legacy JSON messages
+                msg = json.loads(raw)
+                self._handle_json_message(msg, addr)
+                self.ip_tracker.log_message_flow(sender_ip, self.ip, msg.get("type", "JSON"), data_size)
+        except Exception as e:
+            if self.verbose:
+                self.lsnp_logger.info(f"[ERROR] Malformed message from {addr}: {e}")
 
     def _failed_security_check(self, from_id: str, sender_ip: str) -> bool:
         if from_id and "@" in from_id:
@@ -211,438 +409,404 @@ class LSNPController:
         return True
 
     def _handle_kv_message(self, kv: dict, addr: Tuple[str, int]):
-        msg_type = kv.get("TYPE")
-        sender_ip, sender_port = addr
+        handler = self.kv_handlers.get(kv.get("TYPE"))
+        if handler:
+            handler(kv, addr)
+
+    def _handle_profile(self, kv: dict, addr: Tuple[str, int]):
+        sender_ip = addr[0]
+        from_id = kv.get("USER_ID", "")
+        display_name = kv.get("DISPLAY_NAME", "")
+        avatar_data = kv.get("AVATAR_DATA")
+        avatar_type = kv.get("AVATAR_TYPE")
+
+        ip = addr[0]
+        port = addr[1]
+
+
+        self.ip_tracker.log_new_ip(sender_ip, from_id, "profile_message")
+        if from_id not in self.peer_map:
+            peer = Peer(from_id, display_name, ip, port)
+            peer.avatar_data = avatar_data
+            peer.avatar_type = avatar_type
+            self.peer_map[from_id] = peer
+            self._index_peer(peer)
+        else:
+            # Update existing peer
+            peer = self.peer_map[from_id]
+            if peer.display_name != display_name:
+                self._rename_peer(peer, display_name)
+            peer.avatar_data = avatar_data
+            peer.avatar_type = avatar_type
 
-        if msg_type == "PROFILE":
-            from_id = kv.get("USER_ID", "")
-            display_name = kv.get("DISPLAY_NAME", "")
-            avatar_data = kv.get("AVATAR_DATA")
-            avatar_type = kv.get("AVATAR_TYPE")
+        if self.verbose:
+            self.lsnp_logger.info(f"[PROFILE] {display_name} ({from_id}) joined from {ip}")
 
-            ip = addr[0]
-            port = addr[1]
+    def _handle_dm(self, kv: dict, addr: Tuple[str, int]):
+        sender_ip = addr[0]
+        from_id = kv.get("FROM", "")
 
+        if self._failed_security_check(from_id, sender_ip):
+            return
 
-            self.ip_tracker.log_new_ip(sender_ip, from_id, "profile_message")
-            if from_id not in self.peer_map:
-                peer = Peer(from_id, display_name, ip, port)
-                peer.avatar_data = avatar_data
-                peer.avatar_type = avatar_type
-                self.peer_map[from_id] = peer
-            else:
-                # Update existing peer
-                self.peer_map[from_id].display_name = display_name
-                self.peer_map[from_id].avatar_data = avatar_data
-                self.peer_map[from_id].avatar_type = avatar_type
+        to_id = kv.get("TO", "")
+        token = kv.get("TOKEN", "")
 
+        # Verify this message is for us
+        if self.verbose:
+            self.lsnp_logger.info(f"[DM] Received from ${from_id} to ${to_id}")
+        if to_id != self.full_user_id:
             if self.verbose:
-                self.lsnp_logger.info(f"[PROFILE] {display_name} ({from_id}) joined from {ip}")
-                
-        elif msg_type == "DM":
-            from_id = kv.get("FROM", "")
-            
-            if self._failed_security_check(from_id, sender_ip):
-                return
-            
-            to_id = kv.get("TO", "")
-            token = kv.get("TOKEN", "")
+                self.lsnp_logger.info(f"[DM IGNORED] Not for us: {to_id}")
+            return
 
-            # Verify this message is for us
+        if not validate_token(token, "chat"):
             if self.verbose:
-                self.lsnp_logger.info(f"[DM] Received from ${from_id} to ${to_id}")
-            if to_id != self.full_user_id:
-                if self.verbose:
-                    self.lsnp_logger.info(f"[DM IGNORED] Not for us: {to_id}")
-                return
-                
-            if not validate_token(token, "chat"):
-                if self.verbose:
-                    self.lsnp_logger.info(f"[DM REJECTED] Invalid token from {from_id}")
-                return
-            content = kv.get("CONTENT", "")
-            message_id = kv.get("MESSAGE_ID", "")
-            timestamp = kv.get("TIMESTAMP", "")
-            
-            # Get display name for prettier output
-            display_name = from_id.split('@')[0]  # Default to username part
-            if self.verbose:
-                self.lsnp_logger.info(f"{display_name}: {content}")
-            # Check if it's from ourselves
-            if from_id == self.full_user_id:
-                display_name = self.display_name
-            else:
-                # Look up in peer_map for other peers
-                for peer in self.peer_map.values():
-                    if peer.user_id == from_id:
-                        display_name = peer.display_name
-                        break
-            
-            self.lsnp_logger.info(f"{display_name}: {content}")
-            self.inbox.append(f"[{timestamp}] {display_name}: {content}")
-            self.lsnp_logger.debug(f"Send Ack")
-            self._send_ack(message_id, addr)
-  
-        elif msg_type == "FOLLOW":
-            from_id = kv.get("FROM", "")
-            
-            if self._failed_security_check(from_id, sender_ip):
-                return
-            
-            to_id = kv.get("TO", "")
-            message_id = kv.get("MESSAGE_ID", "")
-            display_name = from_id.split('@')[0]
-            
-            if to_id == self.full_user_id:
-                self.lsnp_logger.info(f"[NOTIFY] {display_name} ({from_id}) is now following you.")
-                self.inbox.append(f"User {display_name} started following you.")
-                self._send_ack(message_id, addr)
-                self.followers.append(from_id)
-
-        elif msg_type == "UNFOLLOW":
-            from_id = kv.get("FROM", "")
-            
-            if self._failed_security_check(from_id, sender_ip):
-                return
-            
-            message_id = kv.get("MESSAGE_ID", "")
-            display_name = from_id.split('@')[0]
-            self.lsnp_logger.info(f"[NOTIFY] {display_name} ({from_id}) has unfollowed you.")
-            self.inbox.append(f"User {display_name} unfollowed you.")
-            self._send_ack(message_id, addr)
-            self.followers.remove(from_id)
-        
-        elif msg_type == "POST":
-            from_id = kv.get("USER_ID", "")
-            
-            if self._failed_security_check(from_id, sender_ip):
-                return
-            
-            token = kv.get("TOKEN", "")
-            message_id = kv.get("MESSAGE_ID", "")
-            if not validate_token(token, "post"):
-                    self.lsnp_logger.warning(f"[POST REJECTED] Invalid token from {from_id}")
-                    return
-            content = kv.get("CONTENT", "")
-            timestamp = kv.get("TIMESTAMP", "")
-            display_name = None
-            for peer in self.peer_map.values():
-                    if peer.user_id == from_id:
-                            display_name = peer.display_name
-                            break
-            if not display_name:
-              display_name = from_id.split('@')[0]
-            self.lsnp_logger.info(f"[POST] {display_name}: {content}")
-            self.inbox.append(f"[{timestamp}] {display_name} (POST): {content}")
+                self.lsnp_logger.info(f"[DM REJECTED] Invalid token from {from_id}")
+            return
+        content = kv.get("CONTENT", "")
+        message_id = kv.get("MESSAGE_ID", "")
+        timestamp = kv.get("TIMESTAMP", "")
+
+        # Get display name for prettier output
+        if from_id == self.full_user_id:
+            display_name = self.display_name
+        else:
+            display_name = self._display_name_of(from_id)
+
+        self.lsnp_logger.info(f"{display_name}: {content}")
+        self.inbox.append(f"[{timestamp}] {display_name}: {content}")
+        self._send_ack(message_id, addr)
+
+    def _handle_follow(self, kv: dict, addr: Tuple[str, int]):
+        sender_ip = addr[0]
+        from_id = kv.get("FROM", "")
+
+        if self._failed_security_check(from_id, sender_ip):
+            return
+
+        to_id = kv.get("TO", "")
+        message_id = kv.get("MESSAGE_ID", "")
+        display_name = self._short_id_of(from_id)
+
+        if to_id == self.full_user_id:
+            self.lsnp_logger.info(f"[NOTIFY] {display_name} ({from_id}) is now following you.")
+            self.inbox.append(f"User {display_name} started following you.")
             self._send_ack(message_id, addr)
+            self.followers.add(from_id)
 
-        # File transfer message handlers
-        elif msg_type == "FILE_OFFER":
-            from_id = kv.get("FROM", "")
-            if self._failed_security_check(from_id, sender_ip):
-                return
-            
-            self._handle_file_offer(kv, addr)
-            
-        elif msg_type == "FILE_CHUNK":
-            from_id = kv.get("FROM", "")
-            if self._failed_security_check(from_id, sender_ip):
-                return
-            
-            self._handle_file_chunk(kv, addr)
-            
-        elif msg_type == "FILE_RECEIVED":
-            from_id = kv.get("FROM", "")
-            if self._failed_security_check(from_id, sender_ip):
+    def _handle_unfollow(self, kv: dict, addr: Tuple[str, int]):
+        sender_ip = addr[0]
+        from_id = kv.get("FROM", "")
+
+        if self._failed_security_check(from_id, sender_ip):
+            return
+
+        message_id = kv.get("MESSAGE_ID", "")
+        display_name = self._short_id_of(from_id)
+        self.lsnp_logger.info(f"[NOTIFY] {display_name} ({from_id}) has unfollowed you.")
+        self.inbox.append(f"User {display_name} unfollowed you.")
+        self._send_ack(message_id, addr)
+        self.followers.discard(from_id)
+
+    def _handle_post(self, kv: dict, addr: Tuple[str, int]):
+        sender_ip = addr[0]
+        from_id = kv.get("USER_ID", "")
+
+        if self._failed_security_check(from_id, sender_ip):
+            return
+
+        token = kv.get("TOKEN", "")
+        message_id = kv.get("MESSAGE_ID", "")
+        if not validate_token(token, "post"):
+                self.lsnp_logger.warning(f"[POST REJECTED] Invalid token from {from_id}")
                 return
-            
-            self._handle_file_received(kv, addr)
+        content = kv.get("CONTENT", "")
+        timestamp = kv.get("TIMESTAMP", "")
+        display_name = self._display_name_of(from_id)
+        self.lsnp_logger.info(f"[POST] {display_name}: {content}")
+        self.inbox.append(f"[{timestamp}] {display_name} (POST): {content}")
+        self._send_ack(message_id, addr)
+
+    def _handle_ack(self, kv: dict, addr: Tuple[str, int]):
+        message_id = kv.get("MESSAGE_ID", "")
+        if self._resolve_ack(message_id):
+            if self.verbose:
+                self.lsnp_logger.info(f"[ACK] Received for message {message_id}")
 
-        elif msg_type == "ACK":
-            
-            
-            message_id = kv.get("MESSAGE_ID", "")
-            if message_id in self.ack_events:
-                self.ack_events[message_id].set()
-                if self.verbose:
-                    self.lsnp_logger.info(f"[ACK] Received for message {message_id}")
-        
-        elif msg_type == "PING":
-            
-            
-            user_id = kv.get("USER_ID", "")
+    def _handle_ping(self, kv: dict, addr: Tuple[str, int]):
+        user_id = kv.get("USER_ID", "")
+        if self.verbose:
+            self.lsnp_logger.info(f"[PING] From {user_id}")
+
+    def _handle_file_accept(self, kv: dict, addr: Tuple[str, int]):
+        sender_ip = addr[0]
+        from_id = kv.get("FROM", "")
+        if self._failed_security_check(from_id, sender_ip):
+            return
+
+        to_id = kv.get("TO", "")
+        file_id = kv.get("FILEID", "")
+        token = kv.get("TOKEN", "")
+
+        if to_id != self.full_user_id:
+            return
+
+        if not validate_token(token, "file"):
+            self.pending_offers.pop(file_id, None)
             if self.verbose:
-                self.lsnp_logger.info(f"[PING] From {user_id}")
+                self.lsnp_logger.info(f"[FILE_ACCEPT REJECTED] Invalid token from {from_id}")
 
-        elif msg_type == "FILE_ACCEPT":
-            from_id = kv.get("FROM", "")
-            if self._failed_security_check(from_id, sender_ip):
-                return
-            
-            to_id = kv.get("TO", "")
-            file_id = kv.get("FILEID", "")
-            token = kv.get("TOKEN", "")
-            
-            if to_id != self.full_user_id:
-                return
-            
-            if not validate_token(token, "file"):
-                del self.pending_offers[file_id] 
-                if self.verbose:
-                    self.lsnp_logger.info(f"[FILE_ACCEPT REJECTED] Invalid token from {from_id}")
-                
-                return
-            
-            # Signal that file was accepted
-            if file_id in self.file_response_events:
-                self.file_responses[file_id] = "ACCEPTED"
-                self.file_response_events[file_id].set()
-                if self.verbose:
-                    self.lsnp_logger.info(f"[FILE_ACCEPT] Received for {file_id}")
+            return
 
-        elif msg_type == "FILE_REJECT":
-            from_id = kv.get("FROM", "")
-            
-            if self._failed_security_check(from_id, sender_ip):
-                return
-            
-            to_id = kv.get("TO", "")
-            file_id = kv.get("FILEID", "")
-            token = kv.get("TOKEN", "")
-            
-            if to_id != self.full_user_id:
-                return
-            
-            if not validate_token(token, "file"):
-                del self.pending_offers[file_id] 
-                if self.verbose:
-                    self.lsnp_logger.info(f"[FILE_REJECT REJECTED] Invalid token from {from_id}")
-                    
-                return
-            
-            # Signal that file was rejected
-            if file_id in self.file_response_events:
-                self.file_responses[file_id] = "REJECTED"
-                self.file_response_events[file_id].set()
-                if self.verbose:
-                    self.lsnp_logger.info(f"[FILE_REJECT] Received for {file_id}")
-        elif msg_type == "LIKE":
-            from_id = kv.get("FROM", "");
-            
-            if self._failed_security_check(from_id, sender_ip):
-                return
-            
-            to_id = kv.get("TO", "")
-            post_timestamp = kv.get("POST_TIMESTAMP", "")
-            action = kv.get("ACTION", "")
-            timestamp = kv.get("TIMESTAMP", "")
-            token = kv.get("TOKEN", "")
-            
-            
-          
-        elif msg_type == "TICTACTOE_INVITE":
-            from_id = str(kv.get("FROM"))
-            
-            if self._failed_security_check(from_id, sender_ip):
-                return
-            
-            gameid = str(kv.get("GAMEID"))
-            symbol = str(kv.get("SYMBOL"))
-            
-            self.lsnp_logger.info(f"{from_id.split('@')[0]} is inviting you to play tic-tac-toe.")
-            
-            self.tictactoe_games[gameid] = {
-                "board": [" "] * 9,
-                "my_symbol": "O" if symbol == "X" else "X",
-                "opponent": from_id,
-                "turn": 0,
-                "active": True
-            }
-            self.gamemanager._print_ttt_board(self.tictactoe_games[gameid]["board"])
-
-        elif msg_type == "TICTACTOE_MOVE":
-            from_id = str(kv.get("FROM"))
-            
-            if self._failed_security_check(from_id, sender_ip):
-                return
-            
-            gameid = str(kv.get("GAMEID"))
-            pos = int(str(kv.get("POSITION")))
-            sym = kv.get("SYMBOL")
-            game = self.tictactoe_games.get(gameid)
-            if game:
-                game["board"][pos] = sym
-                game["turn"] = int(str(kv.get("TURN")))
-                self.gamemanager._print_ttt_board(game["board"])
-                winner, line = self.gamemanager._check_ttt_winner(game["board"])
-                if winner:
-                    self.send_tictactoe_result(gameid, winner, line)
-
-        elif msg_type == "TICTACTOE_RESULT":
-            from_id = str(kv.get("FROM"))
-            
-            if self._failed_security_check(from_id, sender_ip):
-                return
-            
-            gameid = kv.get("GAMEID")
-            result = kv.get("RESULT")
-            line = kv.get("WINNING_LINE", "")
-            self.lsnp_logger.info(f"Game {gameid} result: {result}")
-            self.lsnp_logger.info(f"Winning line: {line}")
-            self.gamemanager._print_ttt_board(self.tictactoe_games[gameid]["board"])
-            
-            self.tictactoe_games[gameid]["active"] = False
-            del self.tictactoe_games[gameid]
+        # Signal that file was accepted
+        if self._resolve_file_response(file_id, "ACCEPTED"):
+            if self.verbose:
+                self.lsnp_logger.info(f"[FILE_ACCEPT] Received for {file_id}")
 
-        elif msg_type == "GROUP_CREATE":
-            from_id: str = kv.get("FROM", "")
-            
-            from_id = str(kv.get("FROM"))
-            
-            if self._failed_security_check(from_id, sender_ip):
-                return
-            
-            group_id: str = kv.get("GROUP_ID", "")
-            group_name: str = kv.get("GROUP_NAME", "")
-            members: str = kv.get("MEMBERS", "")
-            token: str = kv.get("TOKEN", "")
+    def _handle_file_reject(self, kv: dict, addr: Tuple[str, int]):
+        sender_ip = addr[0]
+        from_id = kv.get("FROM", "")
 
-            parts = members.split(",")
+        if self._failed_security_check(from_id, sender_ip):
+            return
 
-            if self.full_user_id not in parts:
-                return
-            
-            if not validate_token(token, "group"):
-                if self.verbose:
-                    self.lsnp_logger.info(f"[GROUP_CREATE REJECTED] Invalid token from {from_id}")
-                return
-            
-            group = Group(group_id, group_name, from_id, parts)
-            self.groups.append(group)
+        to_id = kv.get("TO", "")
+        file_id = kv.get("FILEID", "")
+        token = kv.get("TOKEN", "")
 
-            self.lsnp_logger.info(f"[GROUP_CREATE] You've been added to \"{group_name}\"")
+        if to_id != self.full_user_id:
+            return
+
+        if not validate_token(token, "file"):
+            self.pending_offers.pop(file_id, None)
             if self.verbose:
-                self.lsnp_logger.info(f"[GROUP_CREATE] Owner: {from_id}")
-                self.lsnp_logger.info(f"[GROUP_CREATE] Members: {members}")
+                self.lsnp_logger.info(f"[FILE_REJECT REJECTED] Invalid token from {from_id}")
 
-        elif msg_type == "GROUP_ADD":
-            from_id: str = kv.get("FROM", "")
-            from_id = str(kv.get("FROM"))
-            
-            if self._failed_security_check(from_id, sender_ip):
-                return
-            group_id: str = kv.get("GROUP_ID", "")
-            group_name: str = kv.get("GROUP_NAME", "")
-            add: str = kv.get("ADD", "")
-            members: str = kv.get("MEMBERS", "")
-            token: str = kv.get("TOKEN", "")
+            return
 
-            add_parts = add.split(",")
-            member_parts = members.split(",")
+        # Signal that file was rejected
+        if self._resolve_file_response(file_id, "REJECTED"):
+            if self.verbose:
+                self.lsnp_logger.info(f"[FILE_REJECT] Received for {file_id}")
 
-            if self.full_user_id not in member_parts:
-                return
-                            
-            if not validate_token(token, "group"):
-                if self.verbose:
-                    self.lsnp_logger.info(f"[GROUP_ADD REJECTED] Invalid token from {from_id}")
-                return
+    def _handle_like(self, kv: dict, addr: Tuple[str, int]):
+        sender_ip = addr[0]
+        from_id = kv.get("FROM", "");
 
-            if self.full_user_id in add_parts:
-                group = Group(group_id, group_name, from_id, member_parts)
-                self.groups.append(group)
-                self.lsnp_logger.info(f"[GROUP_ADD] You've been added to \"{group_name}\"")
-            else:
-                group_index = -1
-                for index, group in enumerate(self.groups):
-                    if group.group_id == group_id:
-                        group_index = index
-                        break
-                self.groups[group_index].members = member_parts
-                self.lsnp_logger.info(f"[GROUP_ADD] The group \"{self.groups[group_index].group_name}\" member list was updated.")
+        if self._failed_security_check(from_id, sender_ip):
+            return
+
+        to_id = kv.get("TO", "")
+        post_timestamp = kv.get("POST_TIMESTAMP", "")
+        action = kv.get("ACTION", "")
+        timestamp = kv.get("TIMESTAMP", "")
+        token = kv.get("TOKEN", "")
+
+    def _handle_tictactoe_invite(self, kv: dict, addr: Tuple[str, int]):
+        sender_ip = addr[0]
+        from_id = str(kv.get("FROM"))
+
+        if self._failed_security_check(from_id, sender_ip):
+            return
+
+        gameid = str(kv.get("GAMEID"))
+        symbol = str(kv.get("SYMBOL"))
+
+        self.lsnp_logger.info(f"{self._short_id_of(from_id)} is inviting you to play tic-tac-toe.")
+
+        game = TicTacToeGame(gameid, "O" if symbol == "X" else "X", from_id)
+        self.tictactoe_games[gameid] = game
+        self.gamemanager._print_ttt_board(game.board)
+
+    def _handle_tictactoe_move(self, kv: dict, addr: Tuple[str, int]):
+        sender_ip = addr[0]
+        from_id = str(kv.get("FROM"))
+
+        if self._failed_security_check(from_id, sender_ip):
+            return
+
+        gameid = str(kv.get("GAMEID"))
+        pos = int(str(kv.get("POSITION")))
+        sym = kv.get("SYMBOL")
+        game = self.tictactoe_games.get(gameid)
+        if game:
+            self.gamemanager._mark_ttt_move(game, pos, str(sym))
+            game.turn = int(str(kv.get("TURN")))
+            self.gamemanager._print_ttt_board(game.board)
+            winner, line = self.gamemanager._check_ttt_winner_after_move(game, pos)
+            if winner:
+                self.send_tictactoe_result(gameid, winner, line)
+
+    def _handle_tictactoe_result(self, kv: dict, addr: Tuple[str, int]):
+        sender_ip = addr[0]
+        from_id = str(kv.get("FROM"))
+
+        if self._failed_security_check(from_id, sender_ip):
+            return
+
+        gameid = kv.get("GAMEID")
+        result = kv.get("RESULT")
+        line = kv.get("WINNING_LINE", "")
+        self.lsnp_logger.info(f"Game {gameid} result: {result}")
+        self.lsnp_logger.info(f"Winning line: {line}")
+        self.gamemanager._print_ttt_board(self.tictactoe_games[gameid].board)
+
+        self.tictactoe_games[gameid].active = False
+        del self.tictactoe_games[gameid]
+
+    def _handle_group_create(self, kv: dict, addr: Tuple[str, int]):
+        sender_ip = addr[0]
+        from_id: str = kv.get("FROM", "")
+
+        from_id = str(kv.get("FROM"))
+
+        if self._failed_security_check(from_id, sender_ip):
+            return
+
+        group_id: str = kv.get("GROUP_ID", "")
+        group_name: str = kv.get("GROUP_NAME", "")
+        members: str = kv.get("MEMBERS", "")
+        token: str = kv.get("TOKEN", "")
+
+        parts = members.split(",")
+
+        if self.full_user_id not in parts:
+            return
+
+        if not validate_token(token, "group"):
             if self.verbose:
-                self.lsnp_logger.info(f"[GROUP_ADD] Owner: {from_id}")
-                self.lsnp_logger.info(f"[GROUP_ADD] Members: {members}")
+                self.lsnp_logger.info(f"[GROUP_CREATE REJECTED] Invalid token from {from_id}")
+            return
 
-        elif msg_type == "GROUP_REMOVE":
-            from_id: str = kv.get("FROM", "")
-            from_id = str(kv.get("FROM"))
-            
-            if self._failed_security_check(from_id, sender_ip):
-                return
-            
-            group_id: str = kv.get("GROUP_ID", "")
-            remove: str = kv.get("REMOVE", "")
-            token: str = kv.get("TOKEN", "")
+        group = Group(group_id, group_name, from_id, parts)
+        self.groups.append(group)
 
-            remove_parts = remove.split(",")
+        self.lsnp_logger.info(f"[GROUP_CREATE] You've been added to \"{group_name}\"")
+        if self.verbose:
+            self.lsnp_logger.info(f"[GROUP_CREATE] Owner: {from_id}")
+            self.lsnp_logger.info(f"[GROUP_CREATE] Members: {members}")
 
-            group_index = -1
-            for index, group in enumerate(self.groups):
-                if group.group_id == group_id:
-                    group_index = index
-                    break
+    def _handle_group_add(self, kv: dict, addr: Tuple[str, int]):
+        sender_ip = addr[0]
+        from_id: str = kv.get("FROM", "")
+        from_id = str(kv.get("FROM"))
 
-            if group_index == -1:
-                return
+        if self._failed_security_check(from_id, sender_ip):
+            return
+        group_id: str = kv.get("GROUP_ID", "")
+        group_name: str = kv.get("GROUP_NAME", "")
+        add: str = kv.get("ADD", "")
+        members: str = kv.get("MEMBERS", "")
+        token: str = kv.get("TOKEN", "")
 
-            if self.full_user_id not in self.groups[group_index].members:
-                return
-            
-            if not validate_token(token, "group"):
-                if self.verbose:
-                    self.lsnp_logger.info(f"[GROUP_REMOVE REJECTED] Invalid token from {from_id}")
-                return
-            
-            if self.full_user_id in remove_parts:
-                self.lsnp_logger.info(f"[GROUP_REMOVE] You've been removed from \"{self.groups[group_index].group_name}\"")
-                self.groups.pop(group_index)
-            else:
-                for member in remove_parts:
-                    self.groups[group_index].members.remove(member)
-                self.lsnp_logger.info(f"[GROUP_REMOVE] The group \"{self.groups[group_index].group_name}\" member list was updated.")
-            
+        add_parts = add.split(",")
+        member_parts = members.split(",")
+
+        if self.full_user_id not in member_parts:
+            return
+
+        if not validate_token(token, "group"):
             if self.verbose:
-                members_str = ""
-                for member in self.groups[group_index].members:
-                    members_str = members_str + ","
-                members_str = members_str[:-1]
-                self.lsnp_logger.info(f"[GROUP_REMOVE] Owner: {from_id}")
-                self.lsnp_logger.info(f"[GROUP_REMOVE] Members: {members_str}")
-
-        elif msg_type == "GROUP_MESSAGE":
-            from_id = kv.get("FROM", "")
-            
-            from_id = str(kv.get("FROM"))
-            
-            if self._failed_security_check(from_id, sender_ip):
-                return
-            
-            group_id: str = kv.get("GROUP_ID", "")
-            content = kv.get("CONTENT", "")
-            message_id = kv.get("MESSAGE_ID", "")
-            token = kv.get("TOKEN", "")
+                self.lsnp_logger.info(f"[GROUP_ADD REJECTED] Invalid token from {from_id}")
+            return
 
+        if self.full_user_id in add_parts:
+            group = Group(group_id, group_name, from_id, member_parts)
+            self.groups.append(group)
+            self.lsnp_logger.info(f"[GROUP_ADD] You've been added to \"{group_name}\"")
+        else:
             group_index = -1
             for index, group in enumerate(self.groups):
                 if group.group_id == group_id:
                     group_index = index
                     break
-            
-            if group_index == -1:
-                return
-            
-            if not validate_token(token, "group"):
-                if self.verbose:
-                    self.lsnp_logger.info(f"[GROUP MESSAGE REJECTED] Invalid token from {from_id}")
-                return
-            
-            self.lsnp_logger.info(f"[\"{self.groups[group_index].group_name}\"] {from_id}: {content}")
-            self._send_ack(message_id, addr)
+            self.groups[group_index].members = member_parts
+            self.lsnp_logger.info(f"[GROUP_ADD] The group \"{self.groups[group_index].group_name}\" member list was updated.")
+        if self.verbose:
+            self.lsnp_logger.info(f"[GROUP_ADD] Owner: {from_id}")
+            self.lsnp_logger.info(f"[GROUP_ADD] Members: {members}")
+
+    def _handle_group_remove(self, kv: dict, addr: Tuple[str, int]):
+        sender_ip = addr[0]
+        from_id: str = kv.get("FROM", "")
+        from_id = str(kv.get("FROM"))
+
+        if self._failed_security_check(from_id, sender_ip):
+            return
+
+        group_id: str = kv.get("GROUP_ID", "")
+        remove: str = kv.get("REMOVE", "")
+        token: str = kv.get("TOKEN", "")
+
+        remove_parts = remove.split(",")
+
+        group_index = -1
+        for index, group in enumerate(self.groups):
+            if group.group_id == group_id:
+                group_index = index
+                break
+
+        if group_index == -1:
+            return
+
+        if self.full_user_id not in self.groups[group_index].members:
+            return
+
+        if not validate_token(token, "group"):
+            if self.verbose:
+                self.lsnp_logger.info(f"[GROUP_REMOVE REJECTED] Invalid token from {from_id}")
+            return
+
+        if self.full_user_id in remove_parts:
+            self.lsnp_logger.info(f"[GROUP_REMOVE] You've been removed from \"{self.groups[group_index].group_name}\"")
+            self.groups.pop(group_index)
+        else:
+            for member in remove_parts:
+                self.groups[group_index].members.remove(member)
+            self.lsnp_logger.info(f"[GROUP_REMOVE] The group \"{self.groups[group_index].group_name}\" member list was updated.")
+
+        if self.verbose:
+            members_str = ",".join(self.groups[group_index].members)
+            self.lsnp_logger.info(f"[GROUP_REMOVE] Owner: {from_id}")
+            self.lsnp_logger.info(f"[GROUP_REMOVE] Members: {members_str}")
+
+    def _handle_group_message(self, kv: dict, addr: Tuple[str, int]):
+        sender_ip = addr[0]
+        from_id = kv.get("FROM", "")
+
+        from_id = str(kv.get("FROM"))
+
+        if self._failed_security_check(from_id, sender_ip):
+            return
+
+        group_id: str = kv.get("GROUP_ID", "")
+        content = kv.get("CONTENT", "")
+        message_id = kv.get("MESSAGE_ID", "")
+        token = kv.get("TOKEN", "")
+
+        group_index = -1
+        for index, group in enumerate(self.groups):
+            if group.group_id == group_id:
+                group_index = index
+                break
+
+        if group_index == -1:
+            return
+
+        if not validate_token(token, "group"):
+            if self.verbose:
+                self.lsnp_logger.info(f"[GROUP MESSAGE REJECTED] Invalid token from {from_id}")
+            return
+
+        self.lsnp_logger.info(f"[\"{self.groups[group_index].group_name}\"] {from_id}: {content}")
+        self._send_ack(message_id, addr)
 
 
     def _handle_file_offer(self, kv: dict, addr: Tuple[str, int]):
         from_id = kv.get("FROM", "")
+        if self._failed_security_check(from_id, addr[0]):
+            return
         to_id = kv.get("TO", "")
         token = kv.get("TOKEN", "")
         
@@ -671,39 +835,32 @@ class LSNPController:
                               total_chunks, from_id, description)
         
         self.pending_offers[file_id] = transfer
+        with self.transfer_expiry_lock:
+            heapq.heappush(self.transfer_expiry, (transfer.timestamp + TRANSFER_MAX_AGE_SECONDS, file_id))
         
-        # Get sender display name
-        sender_name = from_id.split('@')[0]
-        for peer in self.peer_map.values():
-            if peer.user_id == from_id:
-                sender_name = peer.display_name
-                break
+        sender_name = self._display_name_of(from_id)
         
         self.lsnp_logger.info(f"User {sender_name} is sending you a file do you accept?")
         if self.verbose:
             self.lsnp_logger.info(f"[FILE_OFFER] {filename} ({filesize} bytes) from {sender_name}")
 
     def _handle_file_chunk(self, kv: dict, addr: Tuple[str, int]):
-        from_id = kv.get("FROM", "")
-        to_id = kv.get("TO", "")
-        token = kv.get("TOKEN", "")
-        
-        # Verify this message is for us
-        if to_id != self.full_user_id:
+        try:
+            from_id, to_id, file_id, token, chunk_index_str, data_b64 = _get_file_chunk_fields(kv)
+        except KeyError as e:
+            # Every field is required; a chunk missing one cannot be placed or checked
+            if self.verbose:
+                self.lsnp_logger.info(f"[FILE_CHUNK IGNORED] Missing field {e}")
             return
         
-        if not validate_token(token, "file"):
-            if self.verbose:
-                self.lsnp_logger.info(f"[FILE_CHUNK REJECTED] Invalid token from {from_id}")
+        if self._failed_security_check(from_id, addr[0]):
             return
         
-        file_id = kv.get("FILEID", "")
-        chunk_index = int(kv.get("CHUNK_INDEX", "0"))
-        total_chunks = int(kv.get("TOTAL_CHUNKS", "0"))
-        chunk_size = int(kv.get("CHUNK_SIZE", "0"))
-        data_b64 = kv.get("DATA", "")
+        # Verify this message is for us
+        if to_id != self.full_user_id:
+            return
         
-        # Check if we have an active transfer for this file
+        # Check if we have an active transfer for this file before doing any per-chunk work
         transfer = self.active_transfers.get(file_id)
         if not transfer:
             # Ignore chunks for files we haven't accepted
@@ -711,12 +868,28 @@ class LSNPController:
                 self.lsnp_logger.info(f"[FILE_CHUNK IGNORED] No active transfer for {file_id}")
             return
         
+        # Every chunk of a transfer carries the same token, so only re-check it once it changes or expires
+        if token != transfer.token or time.time() > transfer.token_valid_until or token in token_blacklist:
+            valid_until = token_valid_until(token, "file")
+            if not valid_until:
+                if self.verbose:
+                    self.lsnp_logger.info(f"[FILE_CHUNK REJECTED] Invalid token from {from_id}")
+                return
+            transfer.token = token
+            transfer.token_valid_until = valid_until
+        
         try:
-            chunk_data = base64.b64decode(data_b64)
-            success = transfer.add_chunk(chunk_index, chunk_data)
+            chunk_index = int(chunk_index_str)
+            transfer.add_chunk(chunk_index, b64decode(data_b64))
             
             if self.verbose:
-                self.lsnp_logger.info(f"[FILE_CHUNK] {chunk_index+1}/{total_chunks} for {transfer.filename}")
+                now = time.monotonic()
+                pct = transfer.received_chunks * 100 // max(transfer.total_chunks, 1)
+                if transfer.completed or (pct != transfer.last_progress_pct
+                                          and now - transfer.last_progress_log >= FILE_PROGRESS_LOG_INTERVAL_SECONDS):
+                    transfer.last_progress_log = now
+                    transfer.last_progress_pct = pct
+                    self.lsnp_logger.info(f"[FILE_CHUNK] {transfer.received_chunks}/{transfer.total_chunks} for {transfer.filename}")
             
             # Check if transfer is complete
             if transfer.completed:
@@ -726,7 +899,32 @@ class LSNPController:
             if self.verbose:
                 self.lsnp_logger.info(f"[FILE_CHUNK ERROR] Failed to process chunk: {e}")
 
+    def _cleanup_loop(self):
+        """One long-lived thread for periodic transfer cleanup; wakes immediately when stop_event is set"""
+        while not self.stop_event.wait(TRANSFER_CLEANUP_PERIOD_SECONDS):
+            self.cleanup_old_transfers()
+
+    def cleanup_old_transfers(self) -> int:
+        """Drop offers and transfers older than TRANSFER_MAX_AGE_SECONDS. Returns how many were dropped.
+        
+        Only the expired front of the expiry heap is visited, not every transfer.
+        """
+        now = int(time.time())
+        dropped = 0
+        with self.transfer_expiry_lock:
+            while self.transfer_expiry and self.transfer_expiry[0][0] <= now:
+                _, file_id = heapq.heappop(self.transfer_expiry)
+                # Finished transfers were already removed, so their entries pop as no-ops
+                if self.pending_offers.pop(file_id, None) or self.active_transfers.pop(file_id, None):
+                    dropped += 1
+        
+        if dropped and self.verbose:
+            self.lsnp_logger.info(f"[FILE CLEANUP] Dropped {dropped} expired transfer(s)")
+        return dropped
+
     def _handle_file_received(self, kv: dict, addr: Tuple[str, int]):
+        if self._failed_security_check(kv.get("FROM", ""), addr[0]):
+            return
         file_id = kv.get("FILEID", "")
         status = kv.get("STATUS", "")
         
@@ -740,12 +938,11 @@ class LSNPController:
             if not assembled_data:
                 return
             
-            # Create user-specific downloads directory at project root
-            user_downloads_dir = os.path.join(self.project_root, "lsnp_data", self.full_user_id, "downloads")
-            os.makedirs(user_downloads_dir, exist_ok=True)
+            # Still checked per file, in case the directory was removed while running
+            os.makedirs(self.downloads_dir, exist_ok=True)
             
             # Save the file
-            file_path = os.path.join(user_downloads_dir, transfer.filename)
+            file_path = os.path.join(self.downloads_dir, transfer.filename)
             with open(file_path, 'wb') as f:
                 f.write(assembled_data)
             
@@ -756,24 +953,23 @@ class LSNPController:
             self._send_file_received(transfer.file_id, transfer.sender_id, "COMPLETE")
             
             # Clean up
-            if transfer.file_id in self.active_transfers:
-                del self.active_transfers[transfer.file_id]
+            self.active_transfers.pop(transfer.file_id, None)
                 
         except Exception as e:
             self.lsnp_logger.error(f"[FILE_TRANSFER ERROR] Failed to complete transfer: {e}")
 
     def _send_file_received(self, file_id: str, recipient_id: str, status: str):
         """Send FILE_RECEIVED message"""
-        if recipient_id not in self.peer_map:
+        peer = self.peer_map.get(recipient_id)
+        if peer is None:
             return
         
-        peer = self.peer_map[recipient_id]
         timestamp = int(time.time())
         
         msg = f"TYPE: FILE_RECEIVED\nFROM: {self.full_user_id}\nTO: {recipient_id}\nFILEID: {file_id}\nSTATUS: {status}\nTIMESTAMP: {timestamp}\n"
         
         try:
-            self.socket.sendto(msg.encode(), (peer.ip, peer.port))
+            self.socket.sendto(msg.encode(), peer.sockaddr)
             if self.verbose:
                 self.lsnp_logger.info(f"[FILE_RECEIVED SENT] {file_id} - {status}")
         except Exception as e:
@@ -799,12 +995,99 @@ class LSNPController:
 
         elif msg_type == "ACK":
             message_id = msg.get("message_id")
-            if message_id in self.ack_events:
-                self.ack_events[message_id].set()
+            self._resolve_ack(message_id)
+
+    def _resolve_ack(self, message_id: str) -> bool:
+        """Wake whoever is waiting on this message's ACK. Returns False if nobody is."""
+        future = self.ack_events.get(message_id)
+        if future is None:
+            return False
+        self.ack_loop.call_soon_threadsafe(lambda: future.done() or future.set_result(True))
+        return True
+
+    async def _send_until_acked(self, data: bytes, addr: Tuple[str, int], message_id: str, label: str, target: str) -> bool:
+        """Send a datagram up to RETRY_COUNT times, waiting RETRY_INTERVAL for its ACK after each attempt.
+        
+        ACKs are matched by id alone, so a send whose message_id is still in flight waits for that send to finish
+        before claiming the id with its own future. Only the ACK loop touches ack_released.
+        """
+        while message_id in self.ack_released:
+            await self.ack_released[message_id]
+        future = self.ack_loop.create_future()
+        released = self.ack_loop.create_future()
+        self.ack_events[message_id] = future
+        self.ack_released[message_id] = released
+        
+        try:
+            for attempt in range(RETRY_COUNT):
+                self.tx_queue.enqueue(data, addr)
+                self._flush_tx_soon()
+                if self.verbose:
+                    self.lsnp_logger.info(f"[{label} SEND] Attempt {attempt + 1} to {target}")
+                try:
+                    await asyncio.wait_for(asyncio.shield(future), RETRY_INTERVAL)
+                    return True
+                except asyncio.TimeoutError:
+                    if self.verbose:
+                        self.lsnp_logger.info(f"[{label} RETRY] {attempt + 1} for {target}")
+            return False
+        finally:
+            del self.ack_events[message_id]
+            del self.ack_released[message_id]
+            released.set_result(None)
+
+    def _flush_tx_soon(self):
+        """Flush the batch queue once every send that is ready on the ACK loop has enqueued, so a fan-out leaves in one sendmmsg"""
+        if not self.tx_flush_pending:
+            self.tx_flush_pending = True
+            self.ack_loop.call_soon(self._flush_tx)
+
+    def _schedule_flush(self):
+        """Have the ACK loop flush the batch queue, so callers on other threads never block in a send"""
+        self.ack_loop.call_soon_threadsafe(self._flush_tx_soon)
+
+    def _send_soon(self, data: bytes, addr: Tuple[str, int]):
+        """Queue a datagram that needs no ACK and return; the ACK loop writes it out with the next batch"""
+        if not self.tx_queue.try_enqueue(data, addr):
+            # Ring is full: let the ACK loop do the flushing enqueue, so the listener never blocks in a send
+            self.ack_loop.call_soon_threadsafe(self._enqueue_on_loop, data, addr)
+        self._schedule_flush()
+
+    def _enqueue_on_loop(self, data: bytes, addr: Tuple[str, int]):
+        """Queue a datagram from the ACK loop, where flushing a full ring first is allowed to block"""
+        try:
+            self.tx_queue.enqueue(data, addr)
+        except OSError as e:
+            self.lsnp_logger.error(f"[SEND ERROR] Batch send failed: {e}")
+
+    def _flush_tx(self):
+        self.tx_flush_pending = False
+        try:
+            self.tx_queue.flush()
+        except OSError as e:
+            self.lsnp_logger.error(f"[SEND ERROR] Batch send failed: {e}")
+
+    def _submit_reliably(self, sends: List[Tuple[bytes, Tuple[str, int], str, str]], label: str,
+                         on_done: Callable[[List[bool]], None]):
+        """Hand every (data, addr, message_id, target) send to the ACK loop and return immediately.
+        
+        The loop's timers drive every retransmit, so no caller thread waits on an ACK. Once each send is ACKed
+        or gives up, on_done runs on the ACK loop with whether each send was ACKed, in order. ACKs are matched
+        by id alone, so a send whose message_id is already awaiting an ACK is held until that send finishes.
+        """
+        async def send_all():
+            results = await asyncio.gather(*(self._send_until_acked(data, addr, message_id, label, target)
+                                             for data, addr, message_id, target in sends))
+            try:
+                on_done(list(results))
+            except Exception as e:
+                self.lsnp_logger.error(f"[{label} ERROR] {e}")
+
+        asyncio.run_coroutine_threadsafe(send_all(), self.ack_loop)
 
     def _send_ack(self, message_id: str, addr):
-        ack_msg = make_ack_message(message_id)
-        self.socket.sendto(ack_msg.encode(), addr)
+        # Queued rather than sent inline; even a full ring is left to the ACK loop, so the listener never sends
+        self._send_soon(make_ack_message(message_id), addr)
         
         if self.verbose:
             self.lsnp_logger.info(f"[ACK SENT] For message {message_id} to {addr}")
@@ -816,9 +1099,46 @@ class LSNPController:
             "user_id": self.user_id,
             "message_id": message_id
         }
-        self.socket.sendto(json.dumps(ack).encode(), addr)
+        self._send_soon(json.dumps(ack).encode(), addr)
+
+    def _index_peer(self, peer: Peer):
+        """Register a peer's short name and display name so bare names resolve in O(1)"""
+        self.peer_map_by_shortname.setdefault(peer.short_id, peer.user_id)
+        self.peer_map_by_display_name.setdefault(peer.display_name, peer.user_id)
+
+    def _rename_peer(self, peer: Peer, display_name: str):
+        """Give a peer a new display name, moving its display-name index entry with it"""
+        old_name = peer.display_name
+        peer.display_name = display_name
+        if self.peer_map_by_display_name.get(old_name) == peer.user_id:
+            # Hand the old name to another peer still using it, if any, so it never resolves to a renamed peer
+            holder = next((other.user_id for other in self.peer_map.values() if other.display_name == old_name), None)
+            if holder is None:
+                del self.peer_map_by_display_name[old_name]
+            else:
+                self.peer_map_by_display_name[old_name] = holder
+        self.peer_map_by_display_name[display_name] = peer.user_id
+
+    def _resolve_user_id(self, user_id: str) -> str:
+        """Resolve "user" to its full "user@ip" form, leaving unknown or full ids untouched"""
+        if "@" in user_id:
+            return user_id
+        return self.peer_map_by_shortname.get(user_id, user_id)
+
+    def _display_name_of(self, user_id: str) -> str:
+        """Display name of a known peer, falling back to the username part of its id"""
+        peer = self.peer_map.get(user_id)
+        if peer and peer.display_name:
+            return peer.display_name
+        return self._short_id_of(user_id)
+
+    def _short_id_of(self, user_id: str) -> str:
+        """The "user" part of "user@ip", reusing the one a known peer already split out"""
+        peer = self.peer_map.get(user_id)
+        return peer.short_id if peer else user_id.partition('@')[0]
 
     def _on_peer_discovered(self, peer: Peer):
+        self._index_peer(peer)
         self.ip_tracker.log_new_ip(peer.ip, peer.user_id, "mdns_discovery")
         
         if self.verbose:
@@ -826,12 +1146,12 @@ class LSNPController:
 
     def _send_file_response(self, recipient_id: str, file_id: str, response_type: str):
         """Send FILE_ACCEPT or FILE_REJECT message"""
-        if recipient_id not in self.peer_map:
+        peer = self.peer_map.get(recipient_id)
+        if peer is None:
             return
         
-        peer = self.peer_map[recipient_id]
         timestamp = int(time.time())
-        token = generate_token(self.full_user_id, "file")
+        token = self._get_token("file")
         
         msg = (f"TYPE: {response_type}\n"
             f"FROM: {self.full_user_id}\n"
@@ -841,7 +1161,7 @@ class LSNPController:
             f"TIMESTAMP: {timestamp}\n")
         
         try:
-            self.socket.sendto(msg.encode(), (peer.ip, peer.port))
+            self.socket.sendto(msg.encode(), peer.sockaddr)
             if self.verbose:
                 self.lsnp_logger.info(f"[{response_type} SENT] {file_id}")
         except Exception as e:
@@ -850,50 +1170,35 @@ class LSNPController:
 
     def accept_file(self, file_id: str):
         """Accept a pending file offer"""
-        if file_id not in self.pending_offers:
+        transfer = self.pending_offers.pop(file_id, None)
+        if transfer is None:
             self.lsnp_logger.error(f"[ERROR] No pending file offer with ID: {file_id}")
             return
         
-        transfer = self.pending_offers[file_id]
         transfer.accepted = True
         self.active_transfers[file_id] = transfer
-        del self.pending_offers[file_id]
         
         # Send FILE_ACCEPT message to sender
         self._send_file_response(transfer.sender_id, file_id, "FILE_ACCEPT")
         
-        self.lsnp_logger.info(f"[FILE ACCEPTED] {transfer.filename} from {transfer.sender_id.split('@')[0]}")
+        self.lsnp_logger.info(f"[FILE ACCEPTED] {transfer.filename} from {self._short_id_of(transfer.sender_id)}")
 
     def reject_file(self, file_id: str):
         """Reject a pending file offer"""
-        if file_id not in self.pending_offers:
+        transfer = self.pending_offers.pop(file_id, None)
+        if transfer is None:
             self.lsnp_logger.error(f"[ERROR] No pending file offer with ID: {file_id}")
             return
         
-        transfer = self.pending_offers[file_id]
-        
         # Send FILE_REJECT message to sender
         self._send_file_response(transfer.sender_id, file_id, "FILE_REJECT")
         
-        del self.pending_offers[file_id]
-        
-        self.lsnp_logger.info(f"[FILE REJECTED] {transfer.filename} from {transfer.sender_id.split('@')[0]}")
+        self.lsnp_logger.info(f"[FILE REJECTED] {transfer.filename} from {self._short_id_of(transfer.sender_id)}")
 
     def send_file(self, recipient_id: str, file_path: str, description: str = ""):
         """Send a file to another user"""
         # Accept both formats: "user" or "user@ip"
-        if "@" not in recipient_id:
-            # Find the full user_id in peer_map
-            full_recipient_id = None
-            for user_id in self.peer_map:
-                if user_id.startswith(f"{recipient_id}@"):
-                    full_recipient_id = user_id
-                    break
-            if not full_recipient_id:
-                self.lsnp_logger.error(f"[ERROR] Unknown peer: {recipient_id}")
-                return
-            recipient_id = full_recipient_id
-
+        recipient_id = self._resolve_user_id(recipient_id)
         if recipient_id not in self.peer_map:
             self.lsnp_logger.error(f"[ERROR] Unknown peer: {recipient_id}")
             return
@@ -919,23 +1224,31 @@ class LSNPController:
             return
 
         peer = self.peer_map[recipient_id]
+        # The offer, the wait for its answer and the chunk stream all run on the ACK loop, so the REPL
+        # returns at once and several transfers overlap instead of each blocking for up to a minute
+        asyncio.run_coroutine_threadsafe(self._send_file_async(peer, file_path, description), self.ack_loop)
+
+    def _resolve_file_response(self, file_id: str, response: str) -> bool:
+        """Hand a FILE_ACCEPT/FILE_REJECT to the send waiting on it. Returns False if nobody is."""
+        future = self.file_responses.get(file_id)
+        if future is None:
+            return False
+        self.ack_loop.call_soon_threadsafe(lambda: future.done() or future.set_result(response))
+        return True
+
+    async def _send_file_async(self, peer: Peer, file_path: str, description: str):
+        recipient_id = peer.user_id
+        file_id = str(uuid.uuid4())
         
         try:
-            # Read file
-            with open(file_path, 'rb') as f:
-                file_data = f.read()
-            
-            
-            # Generate file metadata
-            file_id = str(uuid.uuid4())
+            # Generate file metadata; the contents are only read chunk by chunk once accepted
             filename = os.path.basename(file_path)
-            filesize = len(file_data)
+            filesize = os.path.getsize(file_path)
             filetype = self._get_file_type(filename)
             timestamp = int(time.time())
-            token = generate_token(self.full_user_id, "file")
-            response_event = threading.Event()
-            self.file_response_events[file_id] = response_event
-            self.file_responses[file_id] = ""
+            token = self._get_token("file")
+            response_future = self.ack_loop.create_future()
+            self.file_responses[file_id] = response_future
             
             # Calculate chunks
             total_chunks = math.ceil(filesize / MAX_CHUNK_SIZE)
@@ -952,79 +1265,82 @@ class LSNPController:
                         f"TIMESTAMP: {timestamp}\n"
                         f"TOKEN: {token}\n")
             
-            self.socket.sendto(offer_msg.encode(), (peer.ip, peer.port))
+            self.socket.sendto(offer_msg.encode(), peer.sockaddr)
             self.lsnp_logger.info(f"[FILE OFFER SENT] {filename} to {peer.display_name}")
             
-            # Wait a bit for the recipient to accept (in a real implementation, 
-            # you might want to wait for an acceptance message)
-            if response_event.wait(timeout=60):  # 60 second timeout
-                response = self.file_responses.get(file_id)
+            try:
+                response = await asyncio.wait_for(response_future, FILE_RESPONSE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                self.lsnp_logger.error(f"[FILE TIMEOUT] No response from {peer.display_name} for {filename}")
+                return
+            
+            if response == "ACCEPTED":
+                self.lsnp_logger.info(f"[FILE ACCEPTED] Sending {filename} to {peer.display_name}")
                 
-                if response == "ACCEPTED":
-                    self.lsnp_logger.info(f"[FILE ACCEPTED] Sending {filename} to {peer.display_name}")
-                    
-                    # Send file chunks
-                    for chunk_index in range(total_chunks):
-                        start = chunk_index * MAX_CHUNK_SIZE
-                        end = min(start + MAX_CHUNK_SIZE, filesize)
-                        chunk_data = file_data[start:end]
-                        chunk_b64 = base64.b64encode(chunk_data).decode()
-                        
-                        chunk_msg = (f"TYPE: FILE_CHUNK\n"
-                                f"FROM: {self.full_user_id}\n"
-                                f"TO: {recipient_id}\n"
-                                f"FILEID: {file_id}\n"
-                                f"CHUNK_INDEX: {chunk_index}\n"
-                                f"TOTAL_CHUNKS: {total_chunks}\n"
-                                f"CHUNK_SIZE: {len(chunk_data)}\n"
-                                f"TOKEN: {token}\n"
-                                f"DATA: {chunk_b64}\n")
-                        
-                        self.socket.sendto(chunk_msg.encode(), (peer.ip, peer.port))
-                        
+                # Send file chunks; fixed fields are encoded once and the base64 stays bytes
+                header = (self.full_user_id_bytes, recipient_id.encode(), file_id.encode(), token.encode())
+                chunks = iter_file_chunks(file_path)
+                loop = asyncio.get_running_loop()
+                started = time.monotonic()
+                sent_chunks = 0
+                sent_bytes = 0
+                try:
+                    while sent_chunks < total_chunks:
+                        # Disk reads and the blocking sendmmsg run on an executor thread, so retransmit timers keep firing
+                        batch_chunks, batch_bytes = await loop.run_in_executor(
+                            None, self._send_file_batch, chunks, sent_chunks, total_chunks, header, peer.sockaddr)
+                        if not batch_chunks:
+                            break
+                        sent_chunks += batch_chunks
+                        sent_bytes += batch_bytes
                         if self.verbose:
-                            self.lsnp_logger.info(f"[FILE CHUNK SENT] {chunk_index+1}/{total_chunks} to {peer.display_name}")
-                        
-                        time.sleep(0.1)  # Small delay between chunks
-                    
-                    self.lsnp_logger.info(f"[FILE TRANSFER COMPLETE] {filename} sent to {peer.display_name}")
-                    
-                elif response == "REJECTED":
-                    self.lsnp_logger.info(f"[FILE REJECTED] {peer.display_name} rejected {filename}")
-                else:
-                    self.lsnp_logger.error(f"[FILE ERROR] Unknown response: {response}")
+                            self.lsnp_logger.info(f"[FILE CHUNK SENT] {sent_chunks}/{total_chunks} to {peer.display_name}")
+                
+                        # Sleep only as long as the batch got ahead of the target rate
+                        delay = started + sent_bytes / FILE_SEND_RATE_BYTES_PER_SECOND - time.monotonic()
+                        await asyncio.sleep(max(delay, 0))
+                finally:
+                    chunks.close()   # Release the file now even if the transfer stopped early
+                
+                self.lsnp_logger.info(f"[FILE TRANSFER COMPLETE] {filename} sent to {peer.display_name}")
+                
+            elif response == "REJECTED":
+                self.lsnp_logger.info(f"[FILE REJECTED] {peer.display_name} rejected {filename}")
             else:
-                self.lsnp_logger.error(f"[FILE TIMEOUT] No response from {peer.display_name} for {filename}")
-            
-            # Clean up
-            if file_id in self.file_response_events:
-                del self.file_response_events[file_id]
-            if file_id in self.file_responses:
-                del self.file_responses[file_id]
+                self.lsnp_logger.error(f"[FILE ERROR] Unknown response: {response}")
                 
         except Exception as e:
             self.lsnp_logger.error(f"[FILE SEND ERROR] {e}")
-            # Clean up on error
-            if file_id in self.file_response_events:
-                del self.file_response_events[file_id]
-            if file_id in self.file_responses:
-                del self.file_responses[file_id]
+        finally:
+            self.file_responses.pop(file_id, None)
+
+    def _send_file_batch(self, chunks: Iterator[bytes], first_index: int, total_chunks: int,
+                         header: Tuple[bytes, bytes, bytes, bytes], addr: Tuple[str, int]) -> Tuple[int, int]:
+        """Read and send the next FILE_SEND_BATCH_CHUNKS chunks in one flush. Runs on an executor thread.
+        
+        Returns how many chunks and frame bytes went out; (0, 0) once the file is exhausted.
+        """
+        from_bytes, to_bytes, file_id_bytes, token_bytes = header
+        sent_chunks = 0
+        sent_bytes = 0
+        # Chunks leave from the bound LSNP port like every other message; the batch queue packs addr once
+        for chunk_index, chunk_data in enumerate(islice(chunks, FILE_SEND_BATCH_CHUNKS), first_index):
+            chunk_msg = _FILE_CHUNK_TEMPLATE % (from_bytes, to_bytes, file_id_bytes, chunk_index, total_chunks,
+                                                len(chunk_data), token_bytes, b64encode(chunk_data))
+            self.tx_queue.enqueue(chunk_msg, addr)
+            sent_chunks += 1
+            sent_bytes += len(chunk_msg)
+        try:
+            self.tx_queue.flush()
+        except OSError as e:
+            # Other traffic shares the queue, so one refused datagram must not abort the transfer
+            self.lsnp_logger.error(f"[SEND ERROR] Batch send failed: {e}")
+        return sent_chunks, sent_bytes
 
     def _get_file_type(self, filename: str) -> str:
         """Get MIME type based on file extension"""
-        ext = filename.lower().split('.')[-1] if '.' in filename else ''
-        mime_types = {
-            'txt': 'text/plain',
-            'jpg': 'image/jpeg',
-            'jpeg': 'image/jpeg',
-            'png': 'image/png',
-            'gif': 'image/gif',
-            'pdf': 'application/pdf',
-            'mp3': 'audio/mpeg',
-            'mp4': 'video/mp4',
-            'zip': 'application/zip'
-        }
-        return mime_types.get(ext, 'application/octet-stream')
+        _, dot, ext = filename.rpartition('.')
+        return MIME_TYPES.get(ext.lower(), 'application/octet-stream') if dot else 'application/octet-stream'
 
     def list_pending_files(self):
         """List pending file offers"""
@@ -1032,13 +1348,14 @@ class LSNPController:
             self.lsnp_logger.info("No pending file offers.")
             return
         
-        self.lsnp_logger.info("Pending file offers:")
+        lines = ["Pending file offers:"]
         for file_id, transfer in self.pending_offers.items():
-            sender_name = transfer.sender_id.split('@')[0]
-            self.lsnp_logger.info(f"- {transfer.filename} ({transfer.filesize} bytes) from {sender_name}")
-            self.lsnp_logger.info(f"  File ID: {file_id}")
+            sender_name = self._short_id_of(transfer.sender_id)
+            lines.append(f"- {transfer.filename} ({transfer.filesize} bytes) from {sender_name}")
+            lines.append(f"  File ID: {file_id}")
             if transfer.description:
-                self.lsnp_logger.info(f"  Description: {transfer.description}")
+                lines.append(f"  Description: {transfer.description}")
+        self.lsnp_logger.info("\n".join(lines))
 
     def list_active_transfers(self):
         """List active file transfers"""
@@ -1046,25 +1363,16 @@ class LSNPController:
             self.lsnp_logger.info("No active file transfers.")
             return
         
-        self.lsnp_logger.info("Active file transfers:")
+        lines = ["Active file transfers:"]
         for file_id, transfer in self.active_transfers.items():
-            sender_name = transfer.sender_id.split('@')[0]
+            sender_name = self._short_id_of(transfer.sender_id)
             progress = f"{transfer.received_chunks}/{transfer.total_chunks}"
-            self.lsnp_logger.info(f"- {transfer.filename} from {sender_name}: {progress} chunks")
+            lines.append(f"- {transfer.filename} from {sender_name}: {progress} chunks")
+        self.lsnp_logger.info("\n".join(lines))
 
     def send_dm(self, recipient_id: str, content: str):
         # Accept both formats: "user" or "user@ip"
-        if "@" not in recipient_id:
-            # Find the full user_id in peer_map
-            full_recipient_id = None
-            for user_id in self.peer_map:
-                if user_id.startswith(f"{recipient_id}@"):
-                    full_recipient_id = user_id
-                    break
-            if not full_recipient_id:
-                self.lsnp_logger.error(f"[ERROR] Unknown peer: {recipient_id}")
-                return
-            recipient_id = full_recipient_id
+        recipient_id = self._resolve_user_id(recipient_id)
 
         if recipient_id not in self.peer_map:
             self.lsnp_logger.error(f"[ERROR] Unknown peer: {recipient_id}")
@@ -1073,8 +1381,8 @@ class LSNPController:
           self.lsnp_logger.info(f"[DM SEND] to {recipient_id}: {content}")
         
         peer = self.peer_map[recipient_id]
-        message_id = str(uuid.uuid4())
-        token = generate_token(self.full_user_id, "chat")
+        message_id = token_hex(4)
+        token = self._get_token("chat")
 
         msg = make_dm_message(
             from_user_id=self.full_user_id,
@@ -1084,38 +1392,17 @@ class LSNPController:
             token=token
         )
 
-        ack_event = threading.Event()
-        self.ack_events[message_id] = ack_event
-
-        for attempt in range(RETRY_COUNT):
-            self.socket.sendto(msg.encode(), (peer.ip, peer.port))
-            if self.verbose:
-                self.lsnp_logger.info(f"[DM SEND] Attempt {attempt + 1} to {recipient_id} at {peer.ip}")
-            
-            if ack_event.wait(RETRY_INTERVAL):
+        def on_done(results: List[bool]):
+            if results[0]:
                 self.lsnp_logger.info(f"[DM SENT] to {peer.display_name} at {peer.ip}")
-                del self.ack_events[message_id]
-                return
-            
-            if self.verbose:
-                self.lsnp_logger.info(f"[RETRY] {attempt + 1} for {recipient_id} at {peer.ip}")
+            else:
+                self.lsnp_logger.error(f"[FAILED] DM to {peer.display_name} at {peer.ip}")
 
-        self.lsnp_logger.error(f"[FAILED] DM to {peer.display_name} at {peer.ip}")
-        del self.ack_events[message_id]
+        self._submit_reliably([(msg, peer.sockaddr, message_id, f"{recipient_id} at {peer.ip}")], "DM", on_done)
 
     def play_tictactoe(self, recipient_id: str):
         # Accept both formats: "user" or "user@ip"
-        if "@" not in recipient_id:
-            # Find the full user_id in peer_map
-            full_recipient_id = None
-            for user_id in self.peer_map:
-                if user_id.startswith(f"{recipient_id}@"):
-                    full_recipient_id = user_id
-                    break
-            if not full_recipient_id:
-                self.lsnp_logger.error(f"[ERROR] Unknown peer: {recipient_id}")
-                return
-            recipient_id = full_recipient_id
+        recipient_id = self._resolve_user_id(recipient_id)
 
         if recipient_id not in self.peer_map:
             self.lsnp_logger.error(f"[ERROR] Unknown peer: {recipient_id}")
@@ -1132,13 +1419,11 @@ class LSNPController:
     def send_ping(self):
         msg = make_ping_message(self.full_user_id)
         # Broadcast ping
-        broadcast_addr = self.ip.rsplit('.', 1)[0] + '.255'
+        broadcast_addr = self.broadcast_addr
   
         try:
-            self.socket.sendto(msg.encode(), (broadcast_addr, self.port))
+            self._send_soon(msg, (broadcast_addr, self.port))
             self.lsnp_logger.info(f"PING BROADCAST: Sent to {broadcast_addr}:{self.port}")    
-            if self.verbose:
-                self.lsnp_logger.info(f"[PING] Sent to {broadcast_addr}")
         except Exception as e:
             self.lsnp_logger.error(f"PING BROADCAST FAILED: To {broadcast_addr} - {e}")
    
@@ -1148,35 +1433,25 @@ class LSNPController:
             return
  
         self.lsnp_logger.info(f"Peer List: {len(self.peer_map)} peers active.")
-        self.lsnp_logger.info("Available peers:")
+        # One log entry for the whole list instead of one per peer
+        lines = ["Available peers:"]
         for peer in self.peer_map.values():
             # Show both short and full format
-            short_id = peer.user_id.split('@')[0]
-            self.lsnp_logger.info(f"- {peer.display_name} ({short_id}) at {peer.ip}: {peer.port}")
+            lines.append(f"- {peer.display_name} ({peer.short_id}) at {peer.ip}: {peer.port}")
+        self.lsnp_logger.info("\n".join(lines))
 
     def group_create(self, group_name: str, members: str):
         parts = members.split(",")
 
         for i, recipient_id in enumerate(parts):
-            if "@" not in recipient_id:
-                # Find the full user_id in peer_map
-                full_recipient_id = None
-                for user_id in self.peer_map:
-                    if user_id.startswith(f"{recipient_id}@"):
-                        full_recipient_id = user_id
-                        break
-                if not full_recipient_id:
-                    self.lsnp_logger.error(f"[ERROR] Unknown peer: {recipient_id}")
-                    return
-                parts[i] = full_recipient_id
-
+            parts[i] = self._resolve_user_id(recipient_id)
             if parts[i] not in self.peer_map:
                 self.lsnp_logger.error(f"[ERROR] Unknown peer: {recipient_id}")
                 return
 
         group_id = str(uuid.uuid4())
         group = Group(group_id, group_name, self.full_user_id, parts)
-        token = generate_token(self.full_user_id, "group")
+        token = self._get_token("group")
         self.groups.append(group)
 
         msg = make_group_create_message(
@@ -1190,104 +1465,76 @@ class LSNPController:
         for member in parts:
             peer = self.peer_map[member]
             try:
-                self.socket.sendto(msg.encode(), (peer.ip, peer.port))
+                self.tx_queue.enqueue(msg, peer.sockaddr)
                 self.lsnp_logger.info(f"[GROUP_CREATE] Added member {peer.ip}:{peer.port}")
             except Exception as e:
                 self.lsnp_logger.error("[GROUP_CREATE] FAILED: To add {peer.ip} - {e}")
 
+        self._schedule_flush()
         self.lsnp_logger.info(f"GROUP CREATE: Group \"{group.group_name}\" successfully created.")
     
         if self.verbose:
             self.lsnp_logger.info(f"[GROUP_CREATE] Group created with {len(group.members) + 1} members.")
 
     def group_add(self, group_index: int, members: str):
+        group = self.groups[group_index]
         parts = members.split(",")
 
         for i, recipient_id in enumerate(parts):
-            if "@" not in recipient_id:
-                # Find the full user_id in peer_map
-                full_recipient_id = None
-                for user_id in self.peer_map:
-                    if user_id.startswith(f"{recipient_id}@"):
-                        full_recipient_id = user_id
-                        break
-                if not full_recipient_id:
-                    self.lsnp_logger.error(f"[ERROR] Unknown peer: {recipient_id}")
-                    return
-                parts[i] = full_recipient_id
-
+            parts[i] = self._resolve_user_id(recipient_id)
             if parts[i] not in self.peer_map:
                 self.lsnp_logger.error(f"[ERROR] Unknown peer: {recipient_id}")
                 return
         
-        for member in parts:
-            self.groups[group_index].members.append(member)
-        token = generate_token(self.full_user_id, "group")
+        group.members.extend(parts)
+        token = self._get_token("group")
 
-        members_str = ""
-        add_str = ""
-        for member in self.groups[group_index].members:
-            members_str = members_str + member + ","
-        for member in parts:
-            add_str = add_str + member + ","
-        members_str = members_str[:-1]
-        add_str = add_str[:-1]
+        members_str = ",".join(group.members)
+        add_str = ",".join(parts)
 
         msg = make_group_add_message(
             from_user_id = self.full_user_id,
-            group_id = self.groups[group_index].group_id,
-            group_name = self.groups[group_index].group_name,
+            group_id = group.group_id,
+            group_name = group.group_name,
             add = add_str, 
             members = members_str,
             token = token
         )
 
-        for member in self.groups[group_index].members:
+        for member in group.members:
             peer = self.peer_map[member]
             try:
-                self.socket.sendto(msg.encode(), (peer.ip, peer.port))
+                self.tx_queue.enqueue(msg, peer.sockaddr)
                 if member in parts:
                     self.lsnp_logger.info(f"[GROUP_ADD] Added member {peer.ip}:{peer.port}")
             except Exception as e:
                 self.lsnp_logger.error("[GROUP_ADD] FAILED: To add {peer.ip} - {e}")
 
-        self.lsnp_logger.info(f"GROUP ADD: Group \"{self.groups[group_index].group_name}\" successfully added {len(parts)} member(s).")
+        self._schedule_flush()
+        self.lsnp_logger.info(f"GROUP ADD: Group \"{group.group_name}\" successfully added {len(parts)} member(s).")
     
         if self.verbose:
-            self.lsnp_logger.info(f"[GROUP_ADD] Group now contains {len(self.groups[group_index].members) + 1} members.")
+            self.lsnp_logger.info(f"[GROUP_ADD] Group now contains {len(group.members) + 1} members.")
 
     def group_remove(self, group_index: int, members: str):
+        group = self.groups[group_index]
         parts = members.split(",")
 
         for i, recipient_id in enumerate(parts):
-            if "@" not in recipient_id:
-                # Find the full user_id in peer_map
-                full_recipient_id = None
-                for user_id in self.peer_map:
-                    if user_id.startswith(f"{recipient_id}@"):
-                        full_recipient_id = user_id
-                        break
-                if not full_recipient_id:
-                    self.lsnp_logger.error(f"[ERROR] Unknown peer: {recipient_id}")
-                    return
-                parts[i] = full_recipient_id
-
+            parts[i] = self._resolve_user_id(recipient_id)
             if parts[i] not in self.peer_map:
                 self.lsnp_logger.error(f"[ERROR] Unknown peer: {recipient_id}")
                 return
         
         for member in parts:
-            self.groups[group_index].members.remove(member)
-        token = generate_token(self.full_user_id, "group")
+            group.members.remove(member)
+        token = self._get_token("group")
 
-        remove_str = ""
-        for member in parts:
-            remove_str = remove_str + member + ","
-        remove_str = remove_str[:-1]
+        remove_str = ",".join(parts)
 
         msg = make_group_remove_message(
             from_user_id = self.full_user_id,
-            group_id = self.groups[group_index].group_id,
+            group_id = group.group_id,
             remove = remove_str, 
             token = token
         )
@@ -1295,122 +1542,88 @@ class LSNPController:
         for member in parts:
             peer = self.peer_map[member]
             try:
-                self.socket.sendto(msg.encode(), (peer.ip, peer.port))
+                self.tx_queue.enqueue(msg, peer.sockaddr)
                 self.lsnp_logger.info(f"[GROUP_REMOVE] Removed member {peer.ip}:{peer.port}")
             except Exception as e:
                 self.lsnp_logger.error("[GROUP_REMOVE] FAILED: To remove {peer.ip} - {e}")
 
-        for member in self.groups[group_index].members:
+        for member in group.members:
             peer = self.peer_map[member]
             try:
-                self.socket.sendto(msg.encode(), (peer.ip, peer.port))
+                self.tx_queue.enqueue(msg, peer.sockaddr)
             except Exception as e:
                 self.lsnp_logger.error("[GROUP_REMOVE] FAILED: To address {peer.ip} - {e}")
 
-        self.lsnp_logger.info(f"GROUP REMOVE: Group \"{self.groups[group_index].group_name}\" successfully removed {len(parts)} member(s).")
+        self._schedule_flush()
+        self.lsnp_logger.info(f"GROUP REMOVE: Group \"{group.group_name}\" successfully removed {len(parts)} member(s).")
     
         if self.verbose:
-            self.lsnp_logger.info(f"[GROUP_REMOVE] Group now contains {len(self.groups[group_index].members) + 1} members.")
+            self.lsnp_logger.info(f"[GROUP_REMOVE] Group now contains {len(group.members) + 1} members.")
 
     def group_message(self, group_index: int, content: str):
-        for recipient_id in self.groups[group_index].members:
-            if recipient_id not in self.peer_map:
+        group = self.groups[group_index]
+        recipients = group.members + [group.owner_id]
+        # Resolve every recipient once; the send list and the result report both reuse these peers
+        peers = []
+        for recipient_id in recipients:
+            peer = self.peer_map.get(recipient_id)
+            if peer is None:
                 self.lsnp_logger.error(f"[ERROR] Unknown peer: {recipient_id}")
                 return
+            peers.append(peer)
+            
+        token = self._get_token("group")
+        group_name = group.group_name
+        sends = []
+        for member, peer in zip(recipients, peers):
+            # A MESSAGE_ID per member, as for posts, so every member's ACK is told apart and all retry at once
+            message_id = token_hex(4)
+            msg = make_group_message(
+                from_user_id = self.full_user_id,
+                group_id = group.group_id,
+                content = content,
+                message_id = message_id,
+                token = token
+            )
+            sends.append((msg, peer.sockaddr, message_id, f"\"{group_name}\" for {member} at {peer.ip}"))
+
+        def on_done(results: List[bool]):
+            for member, peer, acked in zip(recipients, peers, results):
+                if acked:
+                    self.lsnp_logger.info(f"[GROUP MESSAGE SENT] to \"{group_name}\" for {member} at {peer.ip}")
+                else:
+                    self.lsnp_logger.error(f"[FAILED] Group Message to \"{group_name}\" for {member} at {peer.ip}")
 
-        if self.groups[group_index].owner_id not in self.peer_map:
-            self.lsnp_logger.error(f"[ERROR] Unknown peer: {self.groups[group_index].owner_id}")
-            return
-            
-        message_id = str(uuid.uuid4())
-        token = generate_token(self.full_user_id, "group")
-
-        msg = make_group_message(
-            from_user_id = self.full_user_id,
-            group_id = self.groups[group_index].group_id,
-            content = content,
-            message_id = message_id,
-            token = token
-        )
-
-        ack_event = threading.Event()
-        self.ack_events[message_id] = ack_event
-
-        for member in self.groups[group_index].members:
-            peer = self.peer_map[member]
-            try:
-                for attempt in range(RETRY_COUNT):
-                    self.socket.sendto(msg.encode(), (peer.ip, peer.port))
-                    if self.verbose:
-                        self.lsnp_logger.info(f"[GROUP MESSAGE SEND] Attempt {attempt + 1} to \"{self.groups[group_index].group_name}\" for {member} at {peer.ip}")
-                    
-                    if ack_event.wait(RETRY_INTERVAL):
-                        self.lsnp_logger.info(f"[GROUP MESSAGE SENT] to \"{self.groups[group_index].group_name}\" for {member} at {peer.ip}")
-                        break
-                    
-                    if self.verbose:
-                        self.lsnp_logger.info(f"[RETRY] {attempt + 1} to \"{self.groups[group_index].group_name}\" for {member} at {peer.ip}")
-            except Exception as e:
-                self.lsnp_logger.error(f"[FAILED] Group Message to \"{self.groups[group_index].group_name}\" for {member} at {peer.ip}")
-                del self.ack_events[message_id] 
-
-        peer = self.peer_map[self.groups[group_index].owner_id]
-        try:
-            for attempt in range(RETRY_COUNT):
-                self.socket.sendto(msg.encode(), (peer.ip, peer.port))
-                if self.verbose:
-                    self.lsnp_logger.info(f"[GROUP MESSAGE SEND] Attempt {attempt + 1} to \"{self.groups[group_index].group_name}\" for {self.groups[group_index].owner_id} at {peer.ip}")
-                
-                if ack_event.wait(RETRY_INTERVAL):
-                    self.lsnp_logger.info(f"[GROUP MESSAGE SENT] to \"{self.groups[group_index].group_name}\" for {self.groups[group_index].owner_id} at {peer.ip}")
-                    break
-                
-                if self.verbose:
-                    self.lsnp_logger.info(f"[RETRY] {attempt + 1} to \"{self.groups[group_index].group_name}\" for {self.groups[group_index].owner_id} at {peer.ip}")
-        except Exception as e:
-                self.lsnp_logger.error(f"[FAILED] Group Message to \"{self.groups[group_index].group_name}\" for {self.groups[group_index].owner_id} at {peer.ip}")
-                del self.ack_events[message_id] 
-        
-        del self.ack_events[message_id]
+        self._submit_reliably(sends, "GROUP MESSAGE", on_done)
 
     def show_inbox(self):
         if not self.inbox:
             self.lsnp_logger.info("No messages in inbox.")
             return
         
-        self.lsnp_logger.info("Inbox:")
-        for msg in self.inbox:
-            self.lsnp_logger.info(msg)
+        self.lsnp_logger.info("\n".join(["Inbox:", *self.inbox]))
 
     def show_ip_stats(self):
         """Show IP address statistics"""
         stats = self.ip_tracker.get_ip_stats()
-        self.lsnp_logger.info("===| IP Address Statistics |===")
-        self.lsnp_logger.info(f"Total known IPs: {stats['total_known_ips']}")
-        self.lsnp_logger.info(f"Mapped to users: {stats['mapped_users']}")
-        self.lsnp_logger.info(f"Total connection attempts: {stats['total_connection_attempts']}")
-        self.lsnp_logger.info(f"Blocked IPs: {stats['blocked_ips']}")
+        self.lsnp_logger.info("===| IP Address Statistics |===\n"
+                              f"Total known IPs: {stats['total_known_ips']}\n"
+                              f"Mapped to users: {stats['mapped_users']}\n"
+                              f"Total connection attempts: {stats['total_connection_attempts']}\n"
+                              f"Blocked IPs: {stats['blocked_ips']}")
         
         if not stats['top_active_ips']:
             return
  
-        self.lsnp_logger.info("Most active IPs:")
+        lines = ["Most active IPs:"]
         for ip, count in stats['top_active_ips']:
             user = self.ip_tracker.ip_to_user.get(ip, "Unknown")
-            self.lsnp_logger.info(f"  {ip} ({user}): {count} connections")
+            lines.append(f"  {ip} ({user}): {count} connections")
+        self.lsnp_logger.info("\n".join(lines))
         
     def follow(self, user_id: str):
         # Resolve user_id to full_user_id if needed
-        if "@" not in user_id:
-            full_user_id = None
-            for id in self.peer_map:
-                if id.startswith(f"{user_id}@"):
-                    full_user_id = id
-                    break
-            if not full_user_id:
-                self.lsnp_logger.error(f"[ERROR] Unknown peer: {user_id}")
-                return
-            user_id = full_user_id
+        user_id = self._resolve_user_id(user_id)
 
         if user_id not in self.peer_map:
             self.lsnp_logger.error(f"[ERROR] Unknown peer: {user_id}")
@@ -1427,8 +1640,8 @@ class LSNPController:
         self.lsnp_logger.info(f"[FOLLOW] Now following {user_id}")
 
         peer = self.peer_map[user_id]
-        message_id = str(uuid.uuid4())[:8]
-        token = generate_token(self.full_user_id, "follow")
+        message_id = token_hex(4)
+        token = self._get_token("follow")
 
         msg = make_follow_message(
             from_id=self.full_user_id,
@@ -1437,38 +1650,16 @@ class LSNPController:
             token=token
         )
 
-        # Inline ACK logic
-        ack_event = threading.Event()
-        self.ack_events[message_id] = ack_event
-
-        for attempt in range(RETRY_COUNT):
-            self.socket.sendto(msg.encode(), (peer.ip, peer.port))
-            if self.verbose:
-                self.lsnp_logger.info(f"[FOLLOW SEND] Attempt {attempt + 1} to {peer.display_name} at {peer.ip}")
-
-            if ack_event.wait(RETRY_INTERVAL):
+        def on_done(results: List[bool]):
+            if results[0]:
                 self.lsnp_logger.info(f"[FOLLOW SENT] to {peer.display_name} at {peer.ip}")
-                del self.ack_events[message_id]
-                self.following.add(user_id)
-                return
-
-            if self.verbose:
-                self.lsnp_logger.info(f"[FOLLOW RETRY] {attempt + 1} for {peer.display_name} at {peer.ip}")
+            else:
+                self.lsnp_logger.error(f"[FOLLOW FAILED] Could not send to {peer.display_name} at {peer.ip}")
 
-        self.lsnp_logger.error(f"[FOLLOW FAILED] Could not send to {peer.display_name} at {peer.ip}")
-        del self.ack_events[message_id]
+        self._submit_reliably([(msg, peer.sockaddr, message_id, f"{peer.display_name} at {peer.ip}")], "FOLLOW", on_done)
 
     def unfollow(self, user_id: str):
-      if "@" not in user_id:
-          full_user_id = None
-          for id in self.peer_map:
-              if id.startswith(f"{user_id}@"):
-                  full_user_id = id
-                  break
-          if not full_user_id:
-              self.lsnp_logger.error(f"[ERROR] Unknown peer: {user_id}")
-              return
-          user_id = full_user_id
+      user_id = self._resolve_user_id(user_id)
 
       if user_id not in self.peer_map:
           self.lsnp_logger.error(f"[ERROR] Unknown peer: {user_id}")
@@ -1484,8 +1675,8 @@ class LSNPController:
       self.following.remove(user_id)
 
       peer = self.peer_map[user_id]
-      message_id = str(uuid.uuid4())[:8]
-      token = generate_token(self.full_user_id, "unfollow")
+      message_id = token_hex(4)
+      token = self._get_token("unfollow")
 
       msg = make_unfollow_message(
           from_id=self.full_user_id,
@@ -1494,64 +1685,35 @@ class LSNPController:
           token=token
       )
 
-      # Inline ACK logic
-      ack_event = threading.Event()
-      self.ack_events[message_id] = ack_event
-
-      for attempt in range(RETRY_COUNT):
-          self.socket.sendto(msg.encode(), (peer.ip, peer.port))
-          if self.verbose:
-              self.lsnp_logger.info(f"[UNFOLLOW SEND] Attempt {attempt + 1} to {peer.display_name} at {peer.ip}")
-
-          if ack_event.wait(RETRY_INTERVAL):
+      def on_done(results: List[bool]):
+          if results[0]:
               self.lsnp_logger.info(f"[UNFOLLOW SENT] to {peer.display_name} at {peer.ip}")
-              del self.ack_events[message_id]
-              self.following.remove(user_id)
-              return
+          else:
+              self.lsnp_logger.error(f"[UNFOLLOW FAILED] Could not send to {peer.display_name} at {peer.ip}")
 
-          if self.verbose:
-              self.lsnp_logger.info(f"[UNFOLLOW RETRY] {attempt + 1} for {peer.display_name} at {peer.ip}")
-
-      self.lsnp_logger.error(f"[UNFOLLOW FAILED] Could not send to {peer.display_name} at {peer.ip}")
-      del self.ack_events[message_id]
+      self._submit_reliably([(msg, peer.sockaddr, message_id, f"{peer.display_name} at {peer.ip}")], "UNFOLLOW", on_done)
 
 
     def broadcast_profile(self):
       # Build the PROFILE message
-      msg = make_profile_message(self.display_name, self.full_user_id, self.avatar_path)
-    
-      preview = None
-      if self.avatar_path and os.path.isfile(self.avatar_path):
-        try:
-          with open(self.avatar_path, "rb") as img_file:
-              avatar_base64 = base64.b64encode(img_file.read()).decode('utf-8')
-          preview = avatar_base64[:20] + "..." if len(avatar_base64) > 20 else avatar_base64
-        except Exception as e:
-              self.lsnp_logger.error(f"[DEBUG] Failed to generate avatar preview: {e}")
-              
-
-        # Log the message but without showing full AVATAR_DATA
-      safe_log_msg = msg
-      if "AVATAR_DATA" in safe_log_msg:
-          # Replace the full avatar data with a placeholder in the log
-          safe_log_msg = safe_log_msg.replace(
-              msg.split("AVATAR_DATA: ")[1].split("\n", 1)[0],
-              preview if preview else "[hidden]"
-          )
+      msg = make_profile_message(self.display_name, self.full_user_id, self.avatar)
 
-      # self.lsnp_logger.info(f"[DEBUG] PROFILE message to send:\n{safe_log_msg}")
-          
       # Broadcast to the subnet
-      broadcast_addr = self.ip.rsplit('.', 1)[0] + '.255'
+      broadcast_addr = self.broadcast_addr
 
       try:
-          self.socket.sendto(msg.encode(), (broadcast_addr, self.port))
+          self._send_soon(msg, (broadcast_addr, self.port))
           self.lsnp_logger.info(f"[PROFILE BROADCAST] Sent to {broadcast_addr}:{self.port}")
       except Exception as e:
           self.lsnp_logger.error(f"[BROADCAST FAILED] {e}")
 
       if self.verbose:
           self.lsnp_logger.info("[BROADCAST] Profile message sent.")
+          if self.avatar:
+              # Preview from the cached base64 rather than scrubbing it out of the serialized message
+              avatar_type, avatar_base64 = self.avatar
+              preview = avatar_base64[:20] + "..." if len(avatar_base64) > 20 else avatar_base64
+              self.lsnp_logger.info(f"[BROADCAST] Avatar {avatar_type}: {preview}")
 
     def send_post(self, content: str):
       
@@ -1562,114 +1724,61 @@ class LSNPController:
           self.lsnp_logger.warning("[POST] No followers to send the post to.")
           return
 
-      message_map = {}  # Map follower_id → message_id
-      ack_events = {}   # Map message_id → Event
+      sends = []  # (data, addr, message_id, target) per follower
+      # Everything but MESSAGE_ID is the same for every follower, so render it once
+      template = make_post_template(
+          from_id=self.full_user_id,
+          content=content,
+          ttl=state.ttl,
+          timestamp=int(time.time()),
+          token=self._get_token("post")
+      )
 
-      # 1. Send to all followers first
-      
+      # 1. Build one message per follower, reading the attributes the loop needs only once
+      verbose = self.verbose
+      log = self.lsnp_logger
+      peer_map = self.peer_map
       for follower_id in self.followers:
-          if self.verbose:
-              self.lsnp_logger.info(f"[POST] Sending post to {follower_id}")
+          if verbose:
+              log.info(f"[POST] Sending post to {follower_id}")
           if follower_id == self.full_user_id:
-              if self.verbose:
-                  self.lsnp_logger.info("[POST] Skipping self")
+              if verbose:
+                  log.info("[POST] Skipping self")
               continue
-          if follower_id not in self.peer_map:
-              self.lsnp_logger.warning(f"[POST] Skipped unknown follower: {follower_id}")
+          peer = peer_map.get(follower_id)
+          if peer is None:
+              log.warning(f"[POST] Skipped unknown follower: {follower_id}")
               continue
 
-          peer = self.peer_map[follower_id]
-          message_id = str(uuid.uuid4())
-          token = generate_token(self.full_user_id, "post")
-          expiry = int(token.split("|")[1])  # timestamp + ttl
-          timestamp = expiry - state.ttl
-
-          msg = make_post_message(
-              from_id=self.full_user_id,
-              content=content,
-              ttl=state.ttl,
-              message_id=message_id,
-              token=token
-          )
-      
-          # Create event for ACK
-          ack_event = threading.Event()
-          self.ack_events[message_id] = ack_event
-          ack_events[message_id] = ack_event
-          message_map[follower_id] = message_id
-
-          # Initial send (Attempt 1)
-          try:
-              self.socket.sendto(msg.encode(), (peer.ip, peer.port))
-              if self.verbose:
-                  self.lsnp_logger.info(f"[POST SEND] Initial send to {peer.display_name} at {peer.ip}")
-          except Exception as e:
-              self.lsnp_logger.error(f"[POST ERROR] Failed to send to {peer.display_name}: {e}")
-
-      # 2. Retry logic for all pending ACKs in batch
-      for attempt in range(1, RETRY_COUNT):
-          pending = [fid for fid, mid in message_map.items() if not ack_events[mid].is_set()]
-          if not pending:
-              break  # All ACKed, stop early
-
-          if self.verbose:
-              self.lsnp_logger.info(f"[POST RETRY] Attempt {attempt + 1} for {len(pending)} followers")
-        
-          time.sleep(RETRY_INTERVAL)
+          message_id = token_hex(4)
+          msg = template % (message_id.encode(),)
+          sends.append((msg, peer.sockaddr, message_id, f"{peer.display_name} at {peer.ip}"))
 
-          # Resend to those who haven't ACKed
-          for follower_id in pending:
-              message_id = message_map[follower_id]
-        
-              if ack_events[message_id].is_set():
-                continue  # Already ACKed, skip
-            
-              peer = self.peer_map[follower_id]
-              msg = make_post_message(
-                  from_id=self.full_user_id,
-                  content=content,
-                  ttl=state.ttl,
-                  message_id=message_id,
-                  token=generate_token(self.full_user_id, "post")  # regenerate token
-              )
-
-              try:
-                  self.socket.sendto(msg.encode(), (peer.ip, peer.port))
-                  if self.verbose:
-                      self.lsnp_logger.info(f"[POST RETRY] Resent to {peer.display_name} at {peer.ip}")
-              except Exception as e:
-                  self.lsnp_logger.error(f"[POST ERROR] Retry failed for {peer.display_name}: {e}")
-
-          # Wait before next retry
-          time.sleep(RETRY_INTERVAL)
-
-      # 3. Report final result
-      sent_count = sum(1 for mid in message_map.values() if ack_events[mid].is_set())
-      self.lsnp_logger.info(f"[POST COMPLETE] Sent to {sent_count}/{len(self.followers)} followers")
-
-      # Cleanup ack_events
-      for mid in message_map.values():
-          if mid in self.ack_events:
-              del self.ack_events[mid]
+      # 3. Report final result once every follower has ACKed or given up
+      def on_done(results: List[bool]):
+          self.lsnp_logger.info(f"[POST COMPLETE] Sent to {sum(results)}/{len(self.followers)} followers")
+
+      # 2. Retry every follower concurrently on the ACK loop; each round goes out as one batch
+      self._submit_reliably(sends, "POST", on_done)
 
     def toggle_like(self, post_timestamp_id: str, owner_name: str):
-      # Resolve short name to full_user_id using peer_map
-      full_owner_id = None
-      for peer in self.peer_map.values():
-          if peer.display_name == owner_name or peer.user_id.startswith(f"{owner_name}@"):
-              full_owner_id = peer.user_id
-              break
+      # Resolve display name or short name to full_user_id
+      full_owner_id = self.peer_map_by_display_name.get(owner_name) or self._resolve_user_id(owner_name)
 
-      if not full_owner_id:
+      if full_owner_id not in self.peer_map:
           self.lsnp_logger.error(f"[LIKE ERROR] Unknown post owner: {owner_name}")
           return
 
+      if post_timestamp_id in self.pending_likes:
+          self.lsnp_logger.info(f"[LIKE] Still waiting on the last like/unlike of post {post_timestamp_id}")
+          return
+
       peer = self.peer_map[full_owner_id]
       timestamp = str(int(time.time()))
 
       # Determine action (LIKE or UNLIKE)
       action = "UNLIKE" if post_timestamp_id in self.post_likes else "LIKE"
-      token = generate_token(self.full_user_id, "like")
+      token = self._get_token("like")
 
       # Build LIKE message
       msg = make_like_message(
@@ -1681,30 +1790,20 @@ class LSNPController:
           token=token
       )
 
-      # ACK handling
-      ack_event = threading.Event()
-      self.ack_events[timestamp] = ack_event
-
-      for attempt in range(RETRY_COUNT):
-          self.socket.sendto(msg.encode(), (peer.ip, peer.port))
-          if self.verbose:
-              self.lsnp_logger.info(f"[{action} SEND] Attempt {attempt + 1} to {peer.display_name} at {peer.ip}")
-
-          if ack_event.wait(RETRY_INTERVAL):
-              if action == "LIKE":
-                  self.post_likes.add(post_timestamp_id)
-                  self.lsnp_logger.info(f"[LIKE CONFIRMED] Post {post_timestamp_id} by {peer.display_name}")
-              else:
-                  self.post_likes.remove(post_timestamp_id)
-                  self.lsnp_logger.info(f"[UNLIKE CONFIRMED] Post {post_timestamp_id} by {peer.display_name}")
-              del self.ack_events[timestamp]
-              return
-
-          if self.verbose:
-              self.lsnp_logger.info(f"[{action} RETRY] {attempt + 1} for {peer.display_name}")
-
-      self.lsnp_logger.error(f"[{action} FAILED] Could not send {action} to {peer.display_name}")
-      del self.ack_events[timestamp]
+      def on_done(results: List[bool]):
+          self.pending_likes.discard(post_timestamp_id)
+          if not results[0]:
+              self.lsnp_logger.error(f"[{action} FAILED] Could not send {action} to {peer.display_name}")
+          elif action == "LIKE":
+              self.post_likes.add(post_timestamp_id)
+              self.lsnp_logger.info(f"[LIKE CONFIRMED] Post {post_timestamp_id} by {peer.display_name}")
+          else:
+              self.post_likes.discard(post_timestamp_id)
+              self.lsnp_logger.info(f"[UNLIKE CONFIRMED] Post {post_timestamp_id} by {peer.display_name}")
+
+      # LIKE carries no MESSAGE_ID, so its ACK is keyed by timestamp
+      self.pending_likes.add(post_timestamp_id)
+      self._submit_reliably([(msg, peer.sockaddr, timestamp, f"{peer.display_name} at {peer.ip}")], action, on_done)
 
     def send_tictactoe_invite(self, recipient_id: str, symbol: str):
       symbol = symbol.upper()
@@ -1712,27 +1811,25 @@ class LSNPController:
           self.lsnp_logger.error("Symbol must be X or O.")
           return
 
-      if "@" not in recipient_id:
-          for uid in self.peer_map:
-              if uid.startswith(f"{recipient_id}@"):
-                  recipient_id = uid
-                  break
-      if recipient_id not in self.peer_map:
+      recipient_id = self._resolve_user_id(recipient_id)
+      peer = self.peer_map.get(recipient_id)
+      if peer is None:
           self.lsnp_logger.error(f"[ERROR] Unknown peer: {recipient_id}")
           return
       
-      gameid = f"g{len(self.tictactoe_games) % 256}"
-      message_id = str(uuid.uuid4())[:8]
-      token = generate_token(self.full_user_id, "game")
-      timestamp = int(time.time())
-
-      self.tictactoe_games[gameid] = {
-          "board": [" "] * 9,
-          "my_symbol": symbol,
-          "opponent": recipient_id,
-          "turn": 0,
-          "active": True
-      }
+      # Monotonic ids never wrap; skip any id an opponent's invite already took
+      gameid = f"g{self.next_game_seq:x}"
+      while gameid in self.tictactoe_games:
+          self.next_game_seq += 1
+          gameid = f"g{self.next_game_seq:x}"
+      self.next_game_seq += 1
+      message_id = token_hex(4)
+      timestamp = int(_time())
+
+      game = TicTacToeGame(gameid, symbol, recipient_id)
+      self.tictactoe_games[gameid] = game
+      token = self._get_token("game")
+      self._get_move_template(game)
 
       msg = make_tictaceto_invite_message(
           from_user_id=self.full_user_id,
@@ -1744,57 +1841,79 @@ class LSNPController:
           token=token
       )
 
-      peer = self.peer_map[recipient_id]
-      self.socket.sendto(msg.encode(), (peer.ip, peer.port))
-      self.lsnp_logger.info(f"Sent Tic Tac Toe invite to {recipient_id.split('@')[0]} as {symbol}")
+      self.tx_queue.enqueue(msg, peer.sockaddr)
+      self._schedule_flush()
+      self.lsnp_logger.info(f"Sent Tic Tac Toe invite to {self._short_id_of(recipient_id)} as {symbol}")
 
   
+    def _get_token(self, scope: str) -> str:
+      """Reuse this peer's token for a scope, regenerating it only when it is about to expire"""
+      cached = self.session_tokens.get(scope)
+      if cached is None or _time() >= cached[1] - TOKEN_REFRESH_MARGIN_SECONDS:
+          cached = generate_token_with_expiry(self.full_user_id, scope)
+          self.session_tokens[scope] = cached
+      return cached[0]
+
+    def _get_move_template(self, game: TicTacToeGame) -> bytes:
+      """Get the game's pre-rendered move message, rebuilding it only when the session token changes"""
+      token = self._get_token("game")
+      if game.move_template_token != token:
+          game.move_template = make_tictactoe_move_template(
+              from_user_id=self.full_user_id,
+              to_user_id=game.opponent,
+              gameid=game.gameid,
+              symbol=game.my_symbol,
+              token=token
+          )
+          game.move_template_token = token
+      return game.move_template
+
     def send_tictactoe_move(self, gameid: str, position: int):
       game = self.tictactoe_games.get(gameid)
-      if not game or not game.get("active"):
+      if not game or not game.active:
           self.lsnp_logger.error(f"No active game: {gameid}")
           return
-      if position < 0 or position > 8 or game["board"][position] != " ":
+      if position < 0 or position > 8 or game.board[position] != TTT_EMPTY_CELL:
           self.lsnp_logger.error("Invalid move")
           return
 
-      game["board"][position] = game["my_symbol"]
-      game["turn"] += 1
-
-      winner, line = self.gamemanager._check_ttt_winner(game["board"])
-      peer_id = game["opponent"]
-      message_id = str(uuid.uuid4())[:8]
-      token = generate_token(self.full_user_id, "game")
+      peer_id = game.opponent
+      peer = self.peer_map.get(peer_id)
+      if peer is None:
+          self.lsnp_logger.error(f"[ERROR] Unknown peer: {peer_id}")
+          return
 
-      move_msg = make_tictactoe_move_message(
-            from_user_id=self.full_user_id,
-            to_user_id=peer_id,
-            gameid=gameid,
-            message_id=message_id,
-            position=position,
-            symbol=game["my_symbol"],
-            turn=game["turn"],
-            token=token
-      )
-          
+      self.gamemanager._mark_ttt_move(game, position, game.my_symbol)
+      game.turn += 1
 
+      winner, line = self.gamemanager._check_ttt_winner_after_move(game, position)
+      message_id = token_hex(4)
+      move_template = self._get_move_template(game)
+      move_msg = move_template % (message_id.encode(), position, game.turn, int(_time()))
 
-      peer = self.peer_map[peer_id]
-      self.socket.sendto(move_msg.encode(), (peer.ip, peer.port))
-      self.gamemanager._print_ttt_board(game["board"])
+      self.tx_queue.enqueue(move_msg, peer.sockaddr)
+      self.gamemanager._print_ttt_board(game.board)
 
       if winner:
+          # The result goes out in the same flush as the final move
           self.send_tictactoe_result(gameid, winner, line)
+      else:
+          self._schedule_flush()
 
     def send_tictactoe_result(self, gameid: str, winner, line):
       game = self.tictactoe_games.get(gameid)
       if not game:
           return
-      peer_id = game["opponent"]
-      result = "DRAW" if winner == "DRAW" else ( "LOSS" if winner == "LOSS" else ("WIN" if winner == game["my_symbol"] else "LOSS"))
+      peer_id = game.opponent
+      peer = self.peer_map.get(peer_id)
+      if peer is None:
+          self.lsnp_logger.error(f"[ERROR] Unknown peer: {peer_id}")
+          return
+      # A forfeit passes "LOSS", which never equals our symbol
+      result = "DRAW" if winner == "DRAW" else ("WIN" if winner == game.my_symbol else "LOSS")
 
-      message_id = str(uuid.uuid4())[:8]
-      timestamp = int(time.time())
+      message_id = token_hex(4)
+      timestamp = int(_time())
       win_line_str = ",".join(map(str, line)) if line else ""
 
       msg = make_tictactoe_result_message(
@@ -1802,242 +1921,205 @@ class LSNPController:
           to_id=peer_id,
           gameid=gameid,
           result=result,
-          symbol=game["my_symbol"],
+          symbol=game.my_symbol,
           win_line_str=win_line_str,
           message_id=message_id,
           timestamp=timestamp,
-          token=generate_token(self.full_user_id, "game")
+          token=self._get_token("game")
       )
-      
-      
-      peer = self.peer_map[peer_id]
-      self.socket.sendto(msg.encode(), (peer.ip, peer.port))
+
+      self._send_soon(msg, peer.sockaddr)   # Also reached from the listener when the opponent's move ends the game
       self.lsnp_logger.info(f"Game {gameid} ended: {result}")
-      game["active"] = False
+      game.active = False
 
     def forfeit_tictactoe(self, gameid: str):
       self.send_tictactoe_result(gameid, "LOSS", None)
 
 
+    def _cmd_help(self, args: str):
+      self.lsnp_logger.info(HELP_STR)
+
+    def _cmd_dm(self, args: str):
+      parts = args.split(" ", 1)
+      if len(parts) < 2:
+        self.lsnp_logger.info("Usage: dm <user_id> <message>")
+        return
+      recipient_id, message = parts
+      self.send_dm(recipient_id, message)
+
+    def _cmd_post(self, args: str):
+      if not args:
+        self.lsnp_logger.info("Usage: post <message>")
+        return
+      self.send_post(args)
+
+    def _cmd_like(self, args: str):
+      parts = args.split(" ")
+      if len(parts) != 2:
+          self.lsnp_logger.info("Usage: like <post_timestamp_id> <owner_id>")
+          return
+      post_timestamp_id, owner_id = parts
+      self.toggle_like(post_timestamp_id, owner_id)
+
+    def _cmd_ttl(self, args: str):
+      if not args.isdigit():
+          self.lsnp_logger.info("Usage: ttl <seconds>")
+          return
+      state.ttl = int(args)
+      self.session_tokens.clear()   # Cached tokens carry the old TTL
+      self.lsnp_logger.info(f"[TTL] TTL updated to {state.ttl} seconds")
+
+    def _cmd_follow(self, args: str):
+      if not args or " " in args:
+        self.lsnp_logger.info("Usage: follow <user_id>")
+        return
+      self.follow(args)
+
+    def _cmd_unfollow(self, args: str):
+      if not args or " " in args:
+        self.lsnp_logger.info("Usage: unfollow <user_id>")
+        return
+      self.unfollow(args)
+
+    def _cmd_sendfile(self, args: str):
+      parts = args.split(" ", 2)
+      if len(parts) < 2:
+          self.lsnp_logger.info("Usage: sendfile <user_id> <filepath> [description]")
+          return
+      recipient_id, filepath = parts[:2]
+      description = parts[2] if len(parts) > 2 else ""
+      self.send_file(recipient_id, filepath, description)
+
+    def _cmd_acceptfile(self, args: str):
+      if not args:
+          self.lsnp_logger.info("Usage: acceptfile <fileid>")
+          return
+      self.accept_file(args)
+
+    def _cmd_rejectfile(self, args: str):
+      if not args:
+          self.lsnp_logger.info("Usage: rejectfile <fileid>")
+          return
+      self.reject_file(args)
+
+    def _cmd_group(self, args: str):
+      # Select between "help", "lists", "list", "create", "add", "remove", "message"
+      if args == "help":
+          self.lsnp_logger.info(GROUP_HELP_STR)
+          return
+      parts = shlex.split(args)
+      group_index = -1
+      for index, group in enumerate(self.groups):
+          if group.group_name == parts[1]:
+              group_index = index
+              break
+      if group_index == -1 and parts[0] != "create":
+          self.lsnp_logger.info(f"No group exists.")
+          return
+      if parts[0] == "lists":
+          for group in self.groups:
+              self.lsnp_logger.info(f"Group Name: {group.group_name}, Owner: {group.owner_id}, Members: {len(group.members)}")      
+      elif parts[0] == "list":
+          self.lsnp_logger.info(f"{group_index}")       
+          self.lsnp_logger.info(f"Group Name: {self.groups[group_index].group_name}")
+          self.lsnp_logger.info(f"Group Owner: {self.groups[group_index].owner_id}")
+          self.lsnp_logger.info(f"Group Members:")
+          for member in self.groups[group_index].members:
+              self.lsnp_logger.info(f"{member}")
+          return
+      if len(parts) != 3:
+          self.lsnp_logger.info("Usage: group <cmd> <name> <args>")
+          return
+      grp_cmd, grp_name, args = parts
+      if grp_cmd == "create":
+          self.group_create(grp_name, args)
+      elif grp_cmd == "add":
+          if self.groups[group_index].owner_id != self.full_user_id:
+              self.lsnp_logger.info("No permission to manage group.")
+          else:
+              self.group_add(group_index, args)
+      elif grp_cmd == "remove":
+          if self.groups[group_index].owner_id != self.full_user_id:
+              self.lsnp_logger.info("No permission to manage group.")
+          else:
+              self.group_remove(group_index, args)
+      elif grp_cmd == "message":
+          self.group_message(group_index, args)
+      else:
+          self.lsnp_logger.info("Usage: group <cmd> <args>")
+
+    def _cmd_game(self, args: str):
+      sub, _, rest = args.partition(" ")
+      parts = rest.split(" ") if rest else []
+      if sub == "list":
+          if not self.tictactoe_games:
+              self.lsnp_logger.info("No active Tic Tac Toe games.")
+          else:
+              self.lsnp_logger.info("Active Tic Tac Toe games:")
+              for gameid, game in self.tictactoe_games.items():
+                  self.lsnp_logger.info(f"- Game ID: {gameid}, Opponent: {game.opponent}, "
+                                   f"Symbol: {game.my_symbol}, Turn: {game.turn}")
+      elif sub == "invite":
+          if len(parts) != 2:
+              self.lsnp_logger.info("Usage: game invite <user> <X|O>")
+          else:
+              user, symbol = parts
+              self.send_tictactoe_invite(user, symbol)
+      elif sub == "move":
+          if len(parts) != 2:
+              self.lsnp_logger.info("Usage: game move <gameid> <position 0-8>")
+          else:
+              gameid, pos = parts
+              self.send_tictactoe_move(gameid, int(pos))
+      elif sub == "forfeit":
+          if len(parts) != 1:
+              self.lsnp_logger.info("Usage: game forfeit <gameid>")
+          else:
+              self.forfeit_tictactoe(parts[0])
+      else:
+          self.lsnp_logger.info("Usage: game invite <user> <X|O>, "
+                           "game move <gameid> <position 0-8>, "
+                           "game forfeit <gameid>")
+
+    def _cmd_verbose(self, args: str):
+      self.verbose = not self.verbose
+      self.ip_tracker.verbose = self.verbose
+      self.lsnp_logger.info(f"Verbose mode {'on' if self.verbose else 'off'}")
+
+    def _complete(self, text: str, state: int) -> Optional[str]:
+      """readline completer: offers the next word of every command phrase matching the line so far"""
+      if state == 0:
+        line = readline.get_line_buffer()[:readline.get_endidx()]
+        start = len(line) - len(text)
+        words = (phrase[start:].split(" ", 1)[0] for phrase in complete_command(line))
+        self.completions = list(dict.fromkeys(words))
+      return self.completions[state] if state < len(self.completions) else None
+
     def run(self):
+      if readline is not None:
+        self.completions: List[str] = []
+        readline.set_completer(self._complete)
+        readline.parse_and_bind("tab: complete")
       self.lsnp_logger.info(f"LSNP Peer started as {self.full_user_id}")
       self.lsnp_logger.info("Type 'help' for commands.")
       cmd = ""
       while True:
         try:
             cmd = self.lsnp_logger.input("", end="").strip()
-            if cmd == "help":
-              help_str = ("\nCommands:\n"
-                "  peers                                        - List discovered peers\n"
-                "  dms                                          - Show inbox\n"
-                "  dm <user> <msg>                              - Send direct message\n"
-                "  post <msg>                                   - Create a new post to followers\n"
-                "  follow <user>                                - Follow a user\n"
-                "  unfollow <user>                              - Unfollow a user\n"
-                "  sendfile <user> <filepath> [description]                 - Send a file\n"
-                "  acceptfile <fileid>                          - Accept a pending file offer\n"
-                "  rejectfile <fileid>                          - Reject a pending file offer\n"
-                "  pendingfiles                                 - List pending file offers\n"
-                "  transfers                                    - List active file transfers\n"
-                "  broadcast                                    - Send profile broadcast\n"
-                "  ttl <seconds>                                - Set TTL for posts (default: 60)\n"
-                "  game list                                    - List active Tic Tac Toe games\n"
-                "  game invite <user> <X|O>                     - Invite to Tic Tac Toe game\n"
-                "  game move <gameid> <position 0-8>            - Make a move in Tic Tac Toe\n"
-                "  game forfeit <gameid>                        - Forfeit a Tic Tac Toe game\n"
-                "  group list <name>                            - Show details of a group\n"
-                "  group create <name> <users>                  - Creates a group with one or more users\n"
-                "  group add <name> <user>                      - Adds a user to the group\n"
-                "  group remove <name> <user>                   - Removes a user from the group\n"
-                "  group message <name> <message>               - Sends a message to the group\n"
-                "  Note: Group names and messages must be enclosed in quotation marks.\n"
-                "  Note: Users must be separated by comma.\n"
-                "  ping                                         - Send ping\n"
-                "  verbose                                      - Toggle verbose mode\n"
-                "  ipstats                                      - Show IP statistics\n"
-                "  quit                                         - Exit")
-              self.lsnp_logger.info(help_str)
-            elif cmd == "peers":
-              self.list_peers()
-            elif cmd == "dms":
-              self.show_inbox()
-            elif cmd.startswith("dm "):
-              parts = cmd.split(" ", 2)
-              if len(parts) < 3:
-                self.lsnp_logger.info("Usage: dm <user_id> <message>")
-                continue
-              _, recipient_id, message = parts
-              self.send_dm(recipient_id, message)
-            elif cmd.startswith("post "):
-              parts = cmd.split(" ", 1)
-              if len(parts) < 2:
-                self.lsnp_logger.info("Usage: post <message>")
-                continue
-              _, message = parts
-              self.send_post(message)
-            elif cmd.startswith("like "):
-              parts = cmd.split(" ")
-              if len(parts) != 3:
-                  self.lsnp_logger.info("Usage: like <post_timestamp_id> <owner_id>")
-                  continue
-
-              _, post_timestamp_id, owner_id = parts
-              self.toggle_like(post_timestamp_id, owner_id)
-            elif cmd.startswith("ttl "):
-              parts = cmd.split(" ", 1)
-              if len(parts) < 2 or not parts[1].isdigit():
-                  self.lsnp_logger.info("Usage: ttl <seconds>")
-                  continue
-              state.ttl = int(parts[1])
-              self.lsnp_logger.info(f"[TTL] TTL updated to {state.ttl} seconds")
-            elif cmd.startswith("follow "):
-              parts = cmd.split(" ", 2)
-              if len(parts) < 2:
-                self.lsnp_logger.info("Usage: follow <user_id>")
-                continue
-              _, user_id = parts
-              self.follow(user_id)
-            elif cmd.startswith("unfollow "):
-              parts = cmd.split(" ", 2)
-              if len(parts) < 2:
-                self.lsnp_logger.info("Usage: unfollow <user_id>")
-                continue
-              _, user_id = parts
-              self.unfollow(user_id)
-            elif cmd.startswith("sendfile "):
-                  parts = cmd.split(" ", 3)
-                  if len(parts) < 3:
-                      self.lsnp_logger.info("Usage: sendfile <user_id> <filepath> [description]")
-                      continue
-                  _, recipient_id, filepath = parts[:3]
-                  description = parts[3] if len(parts) > 3 else ""
-                  self.send_file(recipient_id, filepath, description)
-            elif cmd.startswith("acceptfile "):
-                parts = cmd.split(" ", 1)
-                if len(parts) < 2:
-                    self.lsnp_logger.info("Usage: acceptfile <fileid>")
-                    continue
-                _, file_id = parts
-                self.accept_file(file_id)
-            elif cmd.startswith("rejectfile "):
-                parts = cmd.split(" ", 1)
-                if len(parts) < 2:
-                    self.lsnp_logger.info("Usage: rejectfile <fileid>")
-                    continue
-                _, file_id = parts
-                self.reject_file(file_id)
-            elif cmd == "pendingfiles":
-                self.list_pending_files()
-            elif cmd == "transfers":
-                self.list_active_transfers()
-            elif cmd == "broadcast":
-                self.broadcast_profile()
-            elif cmd.startswith("group "):
-                    # Select "group" command
-                    # Select between "help", "create", "add", "remove", "message"
-                    if cmd == "group help":
-                        group_help_str = ("\nCommands:\n"
-                              "  group list <name>              - Show details of a group\n"
-                              "  group create <name> <users>    - Creates a group with one or more users\n"
-                              "  group add <name> <user>        - Adds a user to the group\n"
-                              "  group remove <name> <user>     - Removes a user from the group\n"
-                              "  group message <name> <message> - Sends a message to the group\n"
-                              "  Note: Group names and messages must be enclosed in quotation marks.\n"
-                              "  Note: Users must be separated by comma.")
-                        self.lsnp_logger.info(group_help_str)
-                        continue
-                    parts = shlex.split(cmd)
-                    group_index = -1
-                    for index, group in enumerate(self.groups):
-                        if group.group_name == parts[2]:
-                            group_index = index
-                            break
-                    if group_index == -1 and parts[1] != "create":
-                        self.lsnp_logger.info(f"No group exists.")
-                        continue
-                    if parts[1] == "lists":
-                        for group in self.groups:
-                            self.lsnp_logger.info(f"Group Name: {group.group_name}, Owner: {group.owner_id}, Members: {len(group.members)}")      
-                    elif parts[1] == "list":
-                        self.lsnp_logger.info(f"{group_index}")       
-                        self.lsnp_logger.info(f"Group Name: {self.groups[group_index].group_name}")
-                        self.lsnp_logger.info(f"Group Owner: {self.groups[group_index].owner_id}")
-                        self.lsnp_logger.info(f"Group Members:")
-                        for member in self.groups[group_index].members:
-                            self.lsnp_logger.info(f"{member}")
-                        continue
-                    if len(parts) != 4:
-                        self.lsnp_logger.info("Usage: group <cmd> <name> <args>")
-                        continue
-                    _, grp_cmd, grp_name, args = parts
-                    if grp_cmd == "create":
-                        self.group_create(grp_name, args)
-                    elif grp_cmd == "add":
-                        if self.groups[group_index].owner_id != self.full_user_id:
-                            self.lsnp_logger.info("No permission to manage group.")
-                        else:
-                            self.group_add(group_index, args)
-                    elif grp_cmd == "remove":
-                        if self.groups[group_index].owner_id != self.full_user_id:
-                            self.lsnp_logger.info("No permission to manage group.")
-                        else:
-                            self.group_remove(group_index, args)
-                    elif grp_cmd == "message":
-                        self.group_message(group_index, args)
-                    else:
-                        self.lsnp_logger.info("Usage: group <cmd> <args>")
-                        continue
-            elif cmd == "game":
-                self.lsnp_logger.info("Usage: game invite <user> <X|O>, "
-                                 "game move <gameid> <position 0-8>, "
-                                 "game forfeit <gameid>")
-            elif cmd == "game list":
-                if not self.tictactoe_games:
-                    self.lsnp_logger.info("No active Tic Tac Toe games.")
-                else:
-                    self.lsnp_logger.info("Active Tic Tac Toe games:")
-                    for gameid, game in self.tictactoe_games.items():
-                        self.lsnp_logger.info(f"- Game ID: {gameid}, Opponent: {game['opponent']}, "
-                                         f"Symbol: {game['my_symbol']}, Turn: {game['turn']}")
-            elif cmd.startswith("game invite "):
-                parts = cmd.split(" ")
-                if len(parts) != 4:
-                    self.lsnp_logger.info("Usage: game invite <user> <X|O>")
-                else:
-                    _, _, user, symbol = parts
-                    self.send_tictactoe_invite(user, symbol)
-                
-            elif cmd.startswith("game move "):
-                parts = cmd.split(" ")
-                if len(parts) != 4:
-                    self.lsnp_logger.info("Usage: game move <gameid> <position 0-8>")
-                else:
-                    _, _, gameid, pos = parts
-                    self.send_tictactoe_move(gameid, int(pos))
-
-            elif cmd.startswith("game forfeit "):
-                parts = cmd.split(" ")
-                if len(parts) != 3:
-                    self.lsnp_logger.info("Usage: game forfeit <gameid>")
-                else:
-                    _, _, gameid = parts
-                    self.forfeit_tictactoe(gameid)
-            elif cmd == "ping":
-                self.send_ping()
-            elif cmd == "verbose":
-                self.verbose = not self.verbose
-                self.lsnp_logger.info(f"Verbose mode {'on' if self.verbose else 'off'}")
-            elif cmd == "ipstats":
-                self.show_ip_stats()
-            elif cmd == "quit":
-                break 
-            else:
+            if cmd == "quit":
+                break
+            verb, _, args = cmd.partition(" ")
+            handler = self.commands.get(verb)
+            if handler is None:
               self.lsnp_logger.warning("Unknown command. Type 'help' for available commands.")
+              continue
+            handler(args.strip())
         except KeyboardInterrupt:
           break
         except Exception as e:
           self.lsnp_logger.error(f"Error: {e}")
 
+      self.stop_event.set()
       self.zeroconf.close()
       if cmd != "quit": print("") # For better looks
 
@@ -1,8 +1,8 @@
 import argparse
 import os
 from src.ui.logging import LogEntry, Logger, LoggerInstance, LogLevel
-from src.network.peer_listener import *
-from src.manager import *
+from src.config import LSNP_PORT
+from src.manager.lsnp_controller import LSNPController
 
 logger = Logger()
 
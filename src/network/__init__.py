@@ -1,4 +1,5 @@
 from .peer_listener import PeerListener
 from .ip_tracker import IPAddressTracker
+from .udp_batch import UDPBatchSender, UDPBatchReceiver
 
-__all__ = ["PeerListener", "IPAddressTracker"]
\ No newline at end of file
+__all__ = ["PeerListener", "IPAddressTracker", "UDPBatchSender", "UDPBatchReceiver"]
\ No newline at end of file
@@ -23,7 +23,8 @@ class IPAddressTracker:
   """
   Logs IP Information, the data flowing between them, and gives statistics about it.
   """
-  def __init__(self) -> None:
+  def __init__(self, verbose: bool = False) -> None:
+    self.verbose = verbose    # Per-packet traffic lines are only formatted and printed in verbose mode
     self.known_ips: Set[str] = set()
     self.ip_to_user: Dict[str, str] = {}
     self.connection_attempts: Dict[str, int] = {}
@@ -45,8 +46,9 @@ class IPAddressTracker:
     """Log connection attempts from specific IPs"""
     
     self.connection_attempts[ip] = self.connection_attempts.get(ip, 0) + 1
-    status = "SUCCESS" if success else "FAILED"
-    ip_logger.info(f"CONN {status}: {ip}:{port} (attempt #{self.connection_attempts[ip]})")
+    if self.verbose or not success:
+      status = "SUCCESS" if success else "FAILED"
+      ip_logger.info(f"CONN {status}: {ip}:{port} (attempt #{self.connection_attempts[ip]})")
     
     # Sussy Baka Activity
     if self.connection_attempts[ip] > 10 and not success:
@@ -54,7 +56,8 @@ class IPAddressTracker:
       
   def log_message_flow(self, from_ip: str, to_ip: str, msg_type: str, size: int):
     """Log message traffic between IPs"""
-    ip_logger.debug(f"MSG {msg_type}: {from_ip} -> {to_ip} ({size} bytes)")
+    if self.verbose:
+      ip_logger.debug(f"MSG {msg_type}: {from_ip} -> {to_ip} ({size} bytes)")
         
   def get_ip_stats(self) -> Dict:
       """Get statistics about IP activity"""
@@ -0,0 +1,256 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import socket
+import sys
+import threading
+from typing import Dict, List, Optional, Tuple
+
+SENDMMSG_MAX_BATCH = 64     # Datagrams handed to the kernel per sendmmsg call
+RECVMMSG_MAX_BATCH = 64     # Datagrams taken from the kernel per recvmmsg call
+MSG_WAITFORONE = 0x10000    # Linux: block for the first datagram only, then take whatever else is queued
+SOCKADDR_CACHE_SIZE = 1024  # Packed peer addresses kept between flushes
+
+class _SockaddrIn(ctypes.Structure):
+  _fields_ = [
+    ("sin_family", ctypes.c_ushort),
+    ("sin_port", ctypes.c_uint16),
+    ("sin_addr", ctypes.c_ubyte * 4),
+    ("sin_zero", ctypes.c_ubyte * 8),
+  ]
+
+class _Iovec(ctypes.Structure):
+  _fields_ = [
+    ("iov_base", ctypes.c_void_p),
+    ("iov_len", ctypes.c_size_t),
+  ]
+
+class _Msghdr(ctypes.Structure):
+  _fields_ = [
+    ("msg_name", ctypes.c_void_p),
+    ("msg_namelen", ctypes.c_uint32),
+    ("msg_iov", ctypes.POINTER(_Iovec)),
+    ("msg_iovlen", ctypes.c_size_t),
+    ("msg_control", ctypes.c_void_p),
+    ("msg_controllen", ctypes.c_size_t),
+    ("msg_flags", ctypes.c_int),
+  ]
+
+class _Mmsghdr(ctypes.Structure):
+  _fields_ = [
+    ("msg_hdr", _Msghdr),
+    ("msg_len", ctypes.c_uint),
+  ]
+
+def _load_sendmmsg():
+  """Returns libc's sendmmsg on Linux, or None where it is unavailable."""
+  if not sys.platform.startswith("linux"):
+    return None
+  try:
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    fn = libc.sendmmsg
+  except (OSError, AttributeError):
+    return None
+  fn.argtypes = [ctypes.c_int, ctypes.POINTER(_Mmsghdr), ctypes.c_uint, ctypes.c_int]
+  fn.restype = ctypes.c_int
+  return fn
+
+_sendmmsg = _load_sendmmsg()
+
+def _load_recvmmsg():
+  """Returns libc's recvmmsg on Linux, or None where it is unavailable."""
+  if not sys.platform.startswith("linux"):
+    return None
+  try:
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    fn = libc.recvmmsg
+  except (OSError, AttributeError):
+    return None
+  fn.argtypes = [ctypes.c_int, ctypes.POINTER(_Mmsghdr), ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+  fn.restype = ctypes.c_int
+  return fn
+
+_recvmmsg = _load_recvmmsg()
+
+class UDPBatchSender:
+  """
+  Queues outgoing datagrams and flushes them with as few syscalls as possible.
+  
+  The queue is a fixed-size ring of `capacity` slots; enqueueing into a full ring flushes it first.
+  On Linux a flush hands up to SENDMMSG_MAX_BATCH datagrams to the kernel per sendmmsg call,
+  pointing the iovecs straight at the queued bytes instead of copying them.
+  Elsewhere it falls back to a plain sendto loop.
+  """
+  def __init__(self, sock: socket.socket, capacity: int = SENDMMSG_MAX_BATCH) -> None:
+    self.sock = sock
+    self._capacity = capacity
+    self._slots: List[Optional[Tuple[bytes, Tuple[str, int]]]] = [None] * capacity
+    self._head = 0      # Index of the oldest queued datagram
+    self._count = 0
+    self._lock = threading.Lock()
+    self._sockaddrs: Dict[Tuple[str, int], _SockaddrIn] = {}   # (ip, port) -> packed sockaddr_in
+
+  def __len__(self) -> int:
+    return self._count
+
+  def enqueue(self, data: bytes, addr: Tuple[str, int]) -> None:
+    """Queue a datagram for the next flush, flushing first if the ring is full"""
+    if not isinstance(data, bytes):
+      data = bytes(data)
+    
+    while not self.try_enqueue(data, addr):
+      try:
+        self.flush()
+      except OSError:
+        self.try_enqueue(data, addr)   # The flush emptied the ring before reporting its failures
+        raise
+
+  def try_enqueue(self, data: bytes, addr: Tuple[str, int]) -> bool:
+    """Queue a datagram without ever sending. Returns False, leaving it unqueued, if the ring is full."""
+    with self._lock:
+      if self._count >= self._capacity:
+        return False
+      self._slots[(self._head + self._count) % self._capacity] = (data, addr)
+      self._count += 1
+      return True
+
+  def flush(self) -> int:
+    """Send every queued datagram. Returns the number of datagrams sent.
+    
+    A datagram the kernel refuses is skipped so the rest of the batch still goes out;
+    once the whole batch is done, the first failure is raised as an OSError counting them all.
+    """
+    with self._lock:
+      batch: List[Tuple[bytes, Tuple[str, int]]] = []
+      for i in range(self._count):
+        index = (self._head + i) % self._capacity
+        batch.append(self._slots[index])  # type: ignore[arg-type]
+        self._slots[index] = None
+      self._head = (self._head + self._count) % self._capacity
+      self._count = 0
+    
+    if not batch:
+      return 0
+    
+    if _sendmmsg is None or self.sock.family != socket.AF_INET:
+      failures = self._send_each(batch)
+    else:
+      failures = []
+      for start in range(0, len(batch), SENDMMSG_MAX_BATCH):
+        failures += self._send_batch(batch[start:start + SENDMMSG_MAX_BATCH])
+    
+    if failures:
+      addr, err = failures[0]
+      raise OSError(err, f"{os.strerror(err)}: {len(failures)} of {len(batch)} datagrams not sent, first to {addr}")
+    return len(batch)
+
+  def _sockaddr(self, addr: Tuple[str, int]) -> _SockaddrIn:
+    """Pack an (ip, port) pair once; peers are sent to over and over. Raises OSError for non dotted-quad hosts."""
+    packed = self._sockaddrs.get(addr)
+    if packed is None:
+      ip, port = addr
+      packed = _SockaddrIn()
+      packed.sin_family = socket.AF_INET
+      packed.sin_port = socket.htons(port)
+      packed.sin_addr[:] = socket.inet_aton(ip)
+      if len(self._sockaddrs) >= SOCKADDR_CACHE_SIZE:
+        self._sockaddrs.clear()
+      self._sockaddrs[addr] = packed
+    return packed
+
+  def _send_each(self, batch: List[Tuple[bytes, Tuple[str, int]]]) -> List[Tuple[Tuple[str, int], int]]:
+    """sendto every datagram. Returns the (addr, errno) of each one that failed."""
+    failures = []
+    for data, addr in batch:
+      try:
+        self.sock.sendto(data, addr)
+      except OSError as e:
+        failures.append((addr, e.errno or 0))
+    return failures
+
+  def _send_batch(self, batch: List[Tuple[bytes, Tuple[str, int]]]) -> List[Tuple[Tuple[str, int], int]]:
+    """sendmmsg up to SENDMMSG_MAX_BATCH datagrams. Returns the (addr, errno) of each one that failed."""
+    count = len(batch)
+    try:
+      addrs = (_SockaddrIn * count)()
+      for i, (_, addr) in enumerate(batch):
+        addrs[i] = self._sockaddr(addr)
+    except OSError:
+      # Not a dotted-quad address (e.g. a hostname), let sendto resolve it
+      return self._send_each(batch)
+    
+    # c_char_p points into each bytes object's own storage, so nothing is copied;
+    # the list keeps those pointers alive until sendmmsg returns
+    payloads = [ctypes.c_char_p(data) for data, _ in batch]
+    iovecs = (_Iovec * count)()
+    msgs = (_Mmsghdr * count)()
+    for i, payload in enumerate(payloads):
+      iovecs[i].iov_base = ctypes.cast(payload, ctypes.c_void_p).value
+      iovecs[i].iov_len = len(batch[i][0])
+      hdr = msgs[i].msg_hdr
+      hdr.msg_name = ctypes.addressof(addrs[i])
+      hdr.msg_namelen = ctypes.sizeof(_SockaddrIn)
+      hdr.msg_iov = ctypes.pointer(iovecs[i])
+      hdr.msg_iovlen = 1
+    
+    base = ctypes.addressof(msgs)
+    failures = []
+    sent = 0
+    while sent < count:
+      pending = ctypes.cast(base + sent * ctypes.sizeof(_Mmsghdr), ctypes.POINTER(_Mmsghdr))
+      result = _sendmmsg(self.sock.fileno(), pending, count - sent, 0)
+      if result < 0:
+        # sendmmsg stops at the first datagram it cannot send; skip just that one
+        failures.append((batch[sent][1], ctypes.get_errno()))
+        result = 1
+      sent += result
+    return failures
+
+class UDPBatchReceiver:
+  """
+  Receives datagrams with as few syscalls as possible.
+  
+  On Linux each recv() blocks for the first datagram and then drains up to `capacity` that are already
+  queued in one recvmmsg call, into buffers allocated once. Elsewhere, or on a socket with a timeout,
+  it falls back to one recvfrom per call.
+  """
+  def __init__(self, sock: socket.socket, buffer_size: int, capacity: int = RECVMMSG_MAX_BATCH) -> None:
+    self.sock = sock
+    self._buffer_size = buffer_size
+    self._capacity = capacity
+    self._buffers = [ctypes.create_string_buffer(buffer_size) for _ in range(capacity)]
+    self._addrs = (_SockaddrIn * capacity)()
+    self._iovecs = (_Iovec * capacity)()
+    self._msgs = (_Mmsghdr * capacity)()
+    for i, buffer in enumerate(self._buffers):
+      self._iovecs[i].iov_base = ctypes.addressof(buffer)
+      self._iovecs[i].iov_len = buffer_size
+      hdr = self._msgs[i].msg_hdr
+      hdr.msg_name = ctypes.addressof(self._addrs[i])
+      hdr.msg_iov = ctypes.pointer(self._iovecs[i])
+      hdr.msg_iovlen = 1
+
+  def recv(self) -> List[Tuple[bytes, Tuple[str, int]]]:
+    """Wait for at least one datagram. Returns every (data, addr) received, oldest first."""
+    if _recvmmsg is None or self.sock.family != socket.AF_INET or self.sock.gettimeout() is not None:
+      return [self.sock.recvfrom(self._buffer_size)]
+    
+    msgs = self._msgs
+    for i in range(self._capacity):
+      msgs[i].msg_hdr.msg_namelen = ctypes.sizeof(_SockaddrIn)   # The kernel overwrites it with the real length
+    
+    while True:
+      count = _recvmmsg(self.sock.fileno(), msgs, self._capacity, MSG_WAITFORONE, None)
+      if count >= 0:
+        break
+      err = ctypes.get_errno()
+      if err != errno.EINTR:  # EINTR: a signal woke us before any datagram arrived
+        raise OSError(err, os.strerror(err))
+    
+    received = []
+    for i in range(count):
+      addr = self._addrs[i]
+      data = ctypes.string_at(self._buffers[i], msgs[i].msg_len)
+      received.append((data, (socket.inet_ntoa(bytes(addr.sin_addr)), socket.ntohs(addr.sin_port))))
+    return received
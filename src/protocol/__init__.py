@@ -1,4 +1,5 @@
 from .types.messages.message_formats import (
+  load_avatar,
   make_profile_message, 
   make_dm_message, 
   make_ack_message, 
@@ -9,12 +10,14 @@ from .types.messages.message_formats import (
   make_like_message,
   make_group_add_message , 
   make_post_message, 
+  make_post_template,
   make_like_message,
   make_tictactoe_result_message,
   make_tictaceto_invite_message,
-  make_tictactoe_move_message
+  make_tictactoe_move_message,
+  make_tictactoe_move_template
   )
 from .types.messages.peer_format import Peer
 
 
-__all__ = [ "make_tictactoe_result_message", "make_tictaceto_invite_message", "make_tictactoe_move_message", "make_profile_message", "make_dm_message", "make_ack_message", "make_ping_message", "make_follow_message", "make_post_message", "make_like_message", "make_group_remove_message",  "make_group_message", "make_group_add_message", "Peer"]
\ No newline at end of file
+__all__ = [ "make_tictactoe_result_message", "make_tictaceto_invite_message", "make_tictactoe_move_message", "make_tictactoe_move_template", "load_avatar", "make_profile_message", "make_dm_message", "make_ack_message", "make_ping_message", "make_follow_message", "make_post_message", "make_post_template", "make_like_message", "make_group_remove_message",  "make_group_message", "make_group_add_message", "Peer"]
\ No newline at end of file
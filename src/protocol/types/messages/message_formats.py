@@ -5,7 +5,17 @@ import base64
 import mimetypes
 from src.utils import *
 
-def make_profile_message(name: str, user_id: str, avatar_path: str|None = None):
+def load_avatar(avatar_path: str|None) -> tuple[str, str]|None:
+    """Reads an avatar image once, returning its (MIME type, base64 data), or None if there is no usable image"""
+    if not avatar_path or not os.path.isfile(avatar_path):
+        return None
+    mime_type, _ = mimetypes.guess_type(avatar_path)
+    if not mime_type:
+        return None
+    with open(avatar_path, "rb") as img_file:
+        return mime_type, base64.b64encode(img_file.read()).decode('utf-8')
+
+def make_profile_message(name: str, user_id: str, avatar: tuple[str, str]|None = None) -> bytes:
     message = {
         "TYPE": "PROFILE",
         "USER_ID": user_id,
@@ -14,19 +24,16 @@ def make_profile_message(name: str, user_id: str, avatar_path: str|None = None):
         "MESSAGE_ID": str(uuid.uuid4())
     }
 
-    if avatar_path and os.path.isfile(avatar_path):
-        mime_type, _ = mimetypes.guess_type(avatar_path)
-        if mime_type:
-            with open(avatar_path, "rb") as img_file:
-                avatar_base64 = base64.b64encode(img_file.read()).decode('utf-8')
-            message["AVATAR_TYPE"] = mime_type
-            message["AVATAR_ENCODING"] = "base64"
-            message["AVATAR_DATA"] = avatar_base64
+    if avatar:
+        avatar_type, avatar_base64 = avatar
+        message["AVATAR_TYPE"] = avatar_type
+        message["AVATAR_ENCODING"] = "base64"
+        message["AVATAR_DATA"] = avatar_base64
                         
-    return format_kv_message(message)
+    return format_kv_message(message).encode()
 
 
-def make_dm_message(from_user_id: str, to_user_id: str, content: str, message_id: str, token: str):
+def make_dm_message(from_user_id: str, to_user_id: str, content: str, message_id: str, token: str) -> bytes:
     return format_kv_message({
         "TYPE": "DM",
         "FROM": from_user_id,
@@ -35,44 +42,33 @@ def make_dm_message(from_user_id: str, to_user_id: str, content: str, message_id
         "TIMESTAMP": int(time.time()),
         "MESSAGE_ID": message_id,
         "TOKEN": token
-    })
+    }).encode()
 
-def make_ack_message(message_id: str):
-    return format_kv_message({
-        "TYPE": "ACK",
-        "MESSAGE_ID": message_id,
-        "STATUS": "RECEIVED"
-    })
+_ACK_HEAD = b"TYPE: ACK\nMESSAGE_ID: "
+_ACK_TAIL = b"\nSTATUS: RECEIVED\n\n"
+
+def make_ack_message(message_id: str) -> bytes:
+    # Sent for every reliable message received, so splice the id between fixed bytes
+    return b"".join((_ACK_HEAD, message_id.encode(), _ACK_TAIL))
 
-def make_ping_message(user_id: str):
+def make_ping_message(user_id: str) -> bytes:
     return format_kv_message({
         "TYPE": "PING",
         "USER_ID": user_id
-    })
+    }).encode()
 
     
 
-def make_follow_message(from_id: str, to_id: str, message_id: str, token: str):
-    return format_kv_message({
-        "TYPE": "FOLLOW",
-        "MESSAGE_ID": message_id,
-        "FROM": from_id,
-        "TO": to_id,
-        "TIMESTAMP": int(time.time()),
-        "TOKEN": token
-    })
+# FOLLOW and UNFOLLOW share a layout and differ only in TYPE
+_FOLLOW_TEMPLATE = b"TYPE: %b\nMESSAGE_ID: %b\nFROM: %b\nTO: %b\nTIMESTAMP: %d\nTOKEN: %b\n\n"
+
+def make_follow_message(from_id: str, to_id: str, message_id: str, token: str) -> bytes:
+    return _FOLLOW_TEMPLATE % (b"FOLLOW", message_id.encode(), from_id.encode(), to_id.encode(), int(time.time()), token.encode())
     
-def make_unfollow_message(from_id: str, to_id: str, message_id: str, token: str):
-    return format_kv_message({
-        "TYPE": "UNFOLLOW",
-        "MESSAGE_ID": message_id,
-        "FROM": from_id,
-        "TO": to_id,
-        "TIMESTAMP": int(time.time()),
-        "TOKEN": token
-    })
+def make_unfollow_message(from_id: str, to_id: str, message_id: str, token: str) -> bytes:
+    return _FOLLOW_TEMPLATE % (b"UNFOLLOW", message_id.encode(), from_id.encode(), to_id.encode(), int(time.time()), token.encode())
 
-def make_group_create_message(from_user_id: str, group_id: str, group_name: str, members: list[str], token: str):
+def make_group_create_message(from_user_id: str, group_id: str, group_name: str, members: list[str], token: str) -> bytes:
     return format_kv_message({
         "TYPE": "GROUP_CREATE",
         "FROM": from_user_id,
@@ -81,9 +77,9 @@ def make_group_create_message(from_user_id: str, group_id: str, group_name: str,
         "MEMBERS": ",".join(members),
         "TIMESTAMP": int(time.time()),
         "TOKEN": token
-    })
+    }).encode()
 
-def make_group_add_message(from_user_id: str, group_id: str, group_name: str, add: str, members: str, token: str):
+def make_group_add_message(from_user_id: str, group_id: str, group_name: str, add: str, members: str, token: str) -> bytes:
     return format_kv_message({
         "TYPE": "GROUP_ADD",
         "FROM": from_user_id,
@@ -93,9 +89,9 @@ def make_group_add_message(from_user_id: str, group_id: str, group_name: str, ad
         "MEMBERS": members,
         "TIMESTAMP": int(time.time()),
         "TOKEN": token
-    })
+    }).encode()
 
-def make_post_message(from_id: str, content: str, ttl: int, message_id: str, token: str):
+def make_post_message(from_id: str, content: str, ttl: int, message_id: str, token: str) -> bytes:
     return format_kv_message({
         "TYPE": "POST",
         "USER_ID": from_id,
@@ -104,9 +100,26 @@ def make_post_message(from_id: str, content: str, ttl: int, message_id: str, tok
         "MESSAGE_ID": message_id,
         "TIMESTAMP": int(time.time()),
         "TOKEN": token
-    })
+    }).encode()
+    
+def make_post_template(from_id: str, content: str, ttl: int, timestamp: int, token: str) -> bytes:
+    """Pre-renders a POST message once for every follower.
+    
+    The result is a bytes %-template that takes (message_id: bytes,) and produces the same bytes as
+    make_post_message(...) sent at `timestamp`.
+    """
+    escape = lambda value: str(value).replace("%", "%%")
+    return format_kv_message({
+        "TYPE": "POST",
+        "USER_ID": escape(from_id),
+        "CONTENT": escape(content),
+        "TTL": ttl,
+        "MESSAGE_ID": "%b",
+        "TIMESTAMP": timestamp,
+        "TOKEN": escape(token)
+    }).encode()
     
-def make_like_message(from_id: str, to_id: str, post_timestamp_id: str, action: str, timestamp: str, token: str):
+def make_like_message(from_id: str, to_id: str, post_timestamp_id: str, action: str, timestamp: str, token: str) -> bytes:
     return format_kv_message({
         "TYPE": "LIKE",
         "FROM": from_id,
@@ -115,8 +128,8 @@ def make_like_message(from_id: str, to_id: str, post_timestamp_id: str, action:
         "ACTION": action,
         "TIMESTAMP": timestamp,
         "TOKEN": token
-    })
-def make_group_remove_message(from_user_id: str, group_id: str, remove: str, token: str):
+    }).encode()
+def make_group_remove_message(from_user_id: str, group_id: str, remove: str, token: str) -> bytes:
     return format_kv_message({
         "TYPE": "GROUP_REMOVE",
         "FROM": from_user_id,
@@ -124,9 +137,9 @@ def make_group_remove_message(from_user_id: str, group_id: str, remove: str, tok
         "REMOVE": remove,
         "TIMESTAMP": int(time.time()),
         "TOKEN": token
-    })
+    }).encode()
 
-def make_group_message(from_user_id: str, group_id: str, message_id: str, content: str, token: str):
+def make_group_message(from_user_id: str, group_id: str, message_id: str, content: str, token: str) -> bytes:
     return format_kv_message({
         "TYPE": "GROUP_MESSAGE",
         "FROM": from_user_id,
@@ -135,10 +148,10 @@ def make_group_message(from_user_id: str, group_id: str, message_id: str, conten
         "CONTENT": content,
         "TIMESTAMP": int(time.time()),
         "TOKEN": token
-    })
+    }).encode()
 
 
-def make_tictaceto_invite_message(from_user_id: str, to_user_id: str, game_id: str, msg_id: str, symbol: str, timestamp: int, token: str):
+def make_tictaceto_invite_message(from_user_id: str, to_user_id: str, game_id: str, msg_id: str, symbol: str, timestamp: int, token: str) -> bytes:
     return format_kv_message({
         "TYPE": "TICTACTOE_INVITE",
         "FROM": from_user_id,
@@ -148,9 +161,9 @@ def make_tictaceto_invite_message(from_user_id: str, to_user_id: str, game_id: s
         "SYMBOL": symbol,
         "TIMESTAMP": timestamp,
         "TOKEN": token
-    })
+    }).encode()
 
-def make_tictactoe_move_message(from_user_id: str, to_user_id: str, gameid: str, message_id: str, symbol: str, position: int, turn:str, token: str):
+def make_tictactoe_move_message(from_user_id: str, to_user_id: str, gameid: str, message_id: str, symbol: str, position: int, turn:str, token: str) -> bytes:
     return format_kv_message({
         "TYPE": "TICTACTOE_MOVE",
         "FROM": from_user_id,
@@ -162,10 +175,30 @@ def make_tictactoe_move_message(from_user_id: str, to_user_id: str, gameid: str,
         "TURN": turn,
         "TIMESTAMP": int(time.time()),
         "TOKEN": token
-    })
+    }).encode()
 
-def make_tictactoe_result_message(from_id: str, to_id: str, gameid: str, result: str, symbol: str, win_line_str: str, message_id: str, timestamp: int, token: str):
-    """Formats a Tic Tac Toe result message for sending over the network."""
+def make_tictactoe_move_template(from_user_id: str, to_user_id: str, gameid: str, symbol: str, token: str) -> bytes:
+    """Pre-renders a TICTACTOE_MOVE message with the fields that stay fixed for a game.
+    
+    The result is a bytes %-template that takes (message_id: bytes, position: int, turn: int, timestamp: int)
+    and produces the same bytes as make_tictactoe_move_message(...).
+    """
+    escape = lambda value: str(value).replace("%", "%%")
+    return format_kv_message({
+        "TYPE": "TICTACTOE_MOVE",
+        "FROM": escape(from_user_id),
+        "TO": escape(to_user_id),
+        "GAMEID": escape(gameid),
+        "MESSAGE_ID": "%b",
+        "POSITION": "%d",
+        "SYMBOL": escape(symbol),
+        "TURN": "%d",
+        "TIMESTAMP": "%d",
+        "TOKEN": escape(token)
+    }).encode()
+
+def make_tictactoe_result_message(from_id: str, to_id: str, gameid: str, result: str, symbol: str, win_line_str: str, message_id: str, timestamp: int, token: str) -> bytes:
+    """Formats a Tic Tac Toe result message for sending over the network, already UTF-8 encoded."""
     return format_kv_message({
           "TYPE": "TICTACTOE_RESULT",
           "FROM": from_id,
@@ -177,4 +210,4 @@ def make_tictactoe_result_message(from_id: str, to_id: str, gameid: str, result:
           "WINNING_LINE": win_line_str,
           "TIMESTAMP": timestamp,
           "TOKEN": token
-    })
\ No newline at end of file
+    }).encode()
\ No newline at end of file
@@ -1,10 +1,17 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Tuple
 
-@dataclass
+@dataclass(slots=True)
 class Peer:
 	user_id: str
 	display_name: str
 	ip: str
 	port: int
 	avatar_data: bytes | None = None
-	avatar_type: str | None = None
\ No newline at end of file
+	avatar_type: str | None = None
+	sockaddr: Tuple[str, int] = field(init=False, repr=False, compare=False)	# (ip, port), built once for sendto
+	short_id: str = field(init=False, repr=False, compare=False)	# "user" part of "user@ip"
+
+	def __post_init__(self):
+		self.sockaddr = (self.ip, self.port)
+		self.short_id = self.user_id.partition('@')[0]
\ No newline at end of file
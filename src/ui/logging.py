@@ -9,6 +9,11 @@ from datetime import timedelta
 import json
 import os
 
+try:
+  import orjson     # Optional: C encoder, much faster than json's pure-Python indented path
+except ImportError:
+  orjson = None
+
 LOG_TIMECHECK_MINUTES = 5
 LOG_DEBUG = False
 LOGGER_CODENAME = 'LOGGER '
@@ -17,6 +22,12 @@ LOG_FILENAME = "logger.log"
 
 console = Console()
 
+def _dumps_indented(data: Any) -> str:
+  """JSON-encode with 2-space indent, using orjson when it is installed"""
+  if orjson is not None:
+    return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8')
+  return json.dumps(data, indent=2)
+
 class LogLevel(Enum):
   """
   Enum for different log levels.
@@ -280,7 +291,7 @@ class Logger:
       with open(self._log_file, 'a', encoding='utf-8') as f:
         if file_exists:
           f.write('\n')  # Add newline separator between archive entries
-        f.write(json.dumps(archive_entry, indent=2))
+        f.write(_dumps_indented(archive_entry))
       
       # Update in-memory logs
       self._logs = logs_to_keep
@@ -1,4 +1,4 @@
-from .tokens import token_blacklist, generate_token, validate_token, revoke_token
+from .tokens import token_blacklist, generate_token, generate_token_with_expiry, validate_token, token_valid_until, revoke_token
 from .parsers import parse_kv_message, format_kv_message
 
-__all__ = ["token_blacklist", "generate_token", "validate_token", "revoke_token", "parse_kv_message", "format_kv_message"]
\ No newline at end of file
+__all__ = ["token_blacklist", "generate_token", "generate_token_with_expiry", "validate_token", "token_valid_until", "revoke_token", "parse_kv_message", "format_kv_message"]
\ No newline at end of file
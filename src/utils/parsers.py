@@ -23,5 +23,10 @@ def parse_kv_message(msg: str) -> dict:
     Returns:
         dict: key-value dict format of a string
     """
-    lines = msg.strip().splitlines()
-    return dict(line.split(": ", 1) for line in lines if ": " in line)
\ No newline at end of file
+    # One partition per line finds and splits on the separator in a single scan
+    fields = {}
+    for line in msg.strip().splitlines():
+        key, sep, value = line.partition(": ")
+        if sep:
+            fields[key] = value
+    return fields
\ No newline at end of file
@@ -6,19 +6,28 @@ import src.manager.state as state
 token_blacklist = {}
 
 def generate_token(user_id: str, scope: str = "chat", ttl: int = TOKEN_TTL) -> str:
-    timestamp = int(time.time())
-    return f"{user_id}|{timestamp + state.ttl}|{scope}"
+    return generate_token_with_expiry(user_id, scope, ttl)[0]
+
+def generate_token_with_expiry(user_id: str, scope: str = "chat", ttl: int = TOKEN_TTL) -> tuple[str, int]:
+    """Same as generate_token, but also returns the expiry it embedded so callers need not parse it back out"""
+    expiry = int(time.time()) + state.ttl
+    return f"{user_id}|{expiry}|{scope}", expiry
 
 def validate_token(token: str, required_scope: str = "chat") -> bool:
+    return token_valid_until(token, required_scope) != 0
+
+def token_valid_until(token: str, required_scope: str = "chat") -> int:
+    """Last second the token stays valid for required_scope, or 0 if it is not valid now, so callers can cache the check"""
     if token in token_blacklist:
-        return False
+        return 0
     try:
         user_id, timestamp_str, scope = token.split("|")
-        if int(time.time()) - int(timestamp_str) > TOKEN_TTL:
-            return False
-        return scope == required_scope
+        valid_until = int(timestamp_str) + TOKEN_TTL
+        if int(time.time()) > valid_until or scope != required_scope:
+            return 0
+        return valid_until
     except:
-        return False
+        return 0
 
 def revoke_token(token: str):
     token_blacklist[token] = True
\ No newline at end of file
@@ -0,0 +1,59 @@
+from src.ui.logging import Logger
+from src.game.tictactoe import GameManager, TicTacToeGame
+
+def _manager() -> GameManager:
+  return GameManager(Logger().get_logger("[TEST][GAME]", console_enabled=False))
+
+def _play(manager: GameManager, moves):
+  """Marks each (position, symbol) move and returns the winner check after every one"""
+  game = TicTacToeGame("g0", "X", "bob@192.168.1.3")
+  results = []
+  for position, symbol in moves:
+    manager._mark_ttt_move(game, position, symbol)
+    results.append(manager._check_ttt_winner_after_move(game, position))
+  return results
+
+def test_row_col_diagonal_wins():
+  manager = _manager()
+  cases = [
+    ((0, 1, 2), "X"),
+    ((2, 5, 8), "O"),
+    ((2, 4, 6), "X"),
+    ((0, 4, 8), "O"),
+  ]
+  for line, symbol in cases:
+    results = _play(manager, [(i, symbol) for i in line])
+    assert results == [(None, None), (None, None), (symbol, line)]
+
+def test_draw_and_in_progress():
+  manager = _manager()
+  results = _play(manager, [(0, "X"), (1, "O"), (2, "X"), (4, "O"), (3, "X"),
+                            (5, "O"), (7, "X"), (6, "O"), (8, "X")])
+  assert results[:-1] == [(None, None)] * 8
+  assert results[-1] == ("DRAW", None)
+
+def test_win_on_the_last_cell_beats_draw():
+  manager = _manager()
+  results = _play(manager, [(0, "X"), (1, "O"), (2, "X"), (4, "O"), (3, "X"),
+                            (5, "O"), (7, "X"), (8, "O"), (6, "X")])
+  assert results[-1] == ("X", (0, 3, 6))
+
+def test_only_the_moving_symbol_can_win():
+  manager = _manager()
+  game = TicTacToeGame("g0", "X", "bob@192.168.1.3")
+  for position, symbol in [(0, "X"), (1, "X"), (2, "X"), (4, "O")]:
+    manager._mark_ttt_move(game, position, symbol)
+
+  assert manager._check_ttt_winner_after_move(game, 4) == (None, None)
+  assert manager._check_ttt_winner_after_move(game, 1) == ("X", (0, 1, 2))
+
+def test_board_is_logged_in_one_entry():
+  manager = _manager()
+  game = TicTacToeGame("g0", "X", "bob@192.168.1.3")
+  manager._mark_ttt_move(game, 4, "X")
+  
+  manager._print_ttt_board(game.board)
+  message = Logger().get_logs(prefix="[TEST][GAME]")[-1].message
+  
+  assert message.count("---+---+---") == 2
+  assert "   | X |   " in message
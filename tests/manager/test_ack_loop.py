@@ -0,0 +1,85 @@
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+
+import src.manager.lsnp_controller as lsnp_controller
+from src.manager.lsnp_controller import LSNPController
+from src.network.udp_batch import UDPBatchSender
+from src.ui.logging import Logger
+
+def _wait_for(predicate, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        value = predicate()
+        if value:
+            return value
+        time.sleep(0.005)
+    raise AssertionError("condition not met in time")
+
+@pytest.fixture
+def controller():
+    """Just the ACK-loop half of a controller: no mDNS, no listener, sends go to a local socket"""
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.settimeout(2)
+
+    ctrl = object.__new__(LSNPController)
+    ctrl.verbose = False
+    ctrl.lsnp_logger = Logger().get_logger("[TEST][ACK]", console_enabled=False)
+    ctrl.ack_events = {}
+    ctrl.ack_released = {}
+    ctrl.tx_queue = UDPBatchSender(sender)
+    ctrl.tx_flush_pending = False
+    ctrl.ack_loop = asyncio.new_event_loop()
+    ctrl.receiver = receiver
+    thread = threading.Thread(target=ctrl.ack_loop.run_forever, daemon=True)
+    thread.start()
+
+    yield ctrl
+
+    ctrl.ack_loop.call_soon_threadsafe(ctrl.ack_loop.stop)
+    thread.join(2)
+    sender.close()
+    receiver.close()
+
+def test_send_with_an_in_flight_id_waits_and_gets_its_own_future(controller):
+    addr = controller.receiver.getsockname()
+    done = []
+    # LIKE ACKs are keyed by a whole-second timestamp, so two likes in one second share an id
+    controller._submit_reliably([(b"like-1000", addr, "1728938500", "bob")], "LIKE", done.append)
+    controller._submit_reliably([(b"like-2000", addr, "1728938500", "bob")], "LIKE", done.append)
+
+    first = _wait_for(lambda: controller.ack_events.get("1728938500"))
+    assert controller.receiver.recvfrom(4096)[0] == b"like-1000"
+    assert controller._resolve_ack("1728938500")
+
+    second = _wait_for(lambda: controller.ack_events.get("1728938500") not in (None, first)
+                               and controller.ack_events["1728938500"])
+    assert not second.done()
+    assert controller.receiver.recvfrom(4096)[0] == b"like-2000"
+    assert controller._resolve_ack("1728938500")
+
+    _wait_for(lambda: len(done) == 2)
+    assert done == [[True], [True]]
+    assert controller.ack_events == {} and controller.ack_released == {}
+
+def test_each_send_pops_only_its_own_entries(controller, monkeypatch):
+    monkeypatch.setattr(lsnp_controller, "RETRY_INTERVAL", 0.2)
+    addr = controller.receiver.getsockname()
+    done = []
+    controller._submit_reliably([(b"acked", addr, "m1", "bob"), (b"lost", addr, "m2", "carol")], "DM", done.append)
+
+    _wait_for(lambda: "m1" in controller.ack_events and "m2" in controller.ack_events)
+    controller._resolve_ack("m1")
+
+    _wait_for(lambda: "m1" not in controller.ack_events)
+    assert "m2" in controller.ack_events and "m2" in controller.ack_released
+
+    _wait_for(lambda: done)
+    assert done == [[True, False]]
+    assert controller.ack_events == {} and controller.ack_released == {}
+    assert controller._resolve_ack("m2") is False
@@ -0,0 +1,10 @@
+from src.manager.lsnp_controller import COMMAND_PHRASES, complete_command
+
+def test_command_phrases_are_sorted_for_bisect():
+    assert list(COMMAND_PHRASES) == sorted(COMMAND_PHRASES)
+
+def test_complete_command_matches_prefix():
+    assert complete_command("game ") == ["game forfeit", "game invite", "game list", "game move"]
+    assert complete_command("group list") == ["group list", "group lists"]
+    assert complete_command("un") == ["unfollow"]
+    assert complete_command("xyz") == []
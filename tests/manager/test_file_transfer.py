@@ -0,0 +1,67 @@
+import base64
+import heapq
+import threading
+import time
+
+from src.manager.lsnp_controller import MAX_CHUNK_SIZE, TRANSFER_MAX_AGE_SECONDS, FileTransfer, LSNPController, _FILE_CHUNK_TEMPLATE, iter_file_chunks
+from src.utils import parse_kv_message
+
+def test_iter_file_chunks_splits_at_chunk_size(tmp_path):
+    data = bytes(range(256)) * 9
+    path = tmp_path / "payload.bin"
+    path.write_bytes(data)
+    
+    chunks = list(iter_file_chunks(str(path)))
+    
+    assert [len(chunk) for chunk in chunks] == [MAX_CHUNK_SIZE, MAX_CHUNK_SIZE, len(data) - 2 * MAX_CHUNK_SIZE]
+    assert b"".join(chunks) == data
+
+def test_iter_file_chunks_empty_file(tmp_path):
+    path = tmp_path / "empty.bin"
+    path.write_bytes(b"")
+    
+    assert list(iter_file_chunks(str(path))) == []
+
+def test_assembled_data_orders_chunks_by_index():
+    transfer = FileTransfer("f1", "a.bin", 7, "application/octet-stream", 3, "alice@10.0.0.1")
+    transfer.accepted = True
+    for index, data in ((2, b"g"), (0, b"abc"), (1, b"def")):
+        transfer.add_chunk(index, data)
+    
+    assert transfer.get_assembled_data() == b"abcdefg"
+
+def test_assembled_data_is_none_until_complete():
+    transfer = FileTransfer("f2", "a.bin", 6, "application/octet-stream", 2, "alice@10.0.0.1")
+    transfer.accepted = True
+    transfer.add_chunk(0, b"abc")
+    
+    assert transfer.get_assembled_data() is None
+
+def test_file_chunk_template_round_trips():
+    data = b"\x00\xffpayload"
+    frame = _FILE_CHUNK_TEMPLATE % (b"alice@10.0.0.1", b"bob@10.0.0.2", b"f1", 3, 5, len(data), b"tok", base64.b64encode(data))
+    kv = parse_kv_message(frame.decode())
+    
+    assert kv["TYPE"] == "FILE_CHUNK"
+    assert (kv["FROM"], kv["TO"], kv["FILEID"], kv["TOKEN"]) == ("alice@10.0.0.1", "bob@10.0.0.2", "f1", "tok")
+    assert (kv["CHUNK_INDEX"], kv["TOTAL_CHUNKS"], kv["CHUNK_SIZE"]) == ("3", "5", str(len(data)))
+    assert base64.b64decode(kv["DATA"]) == data
+
+def test_cleanup_drops_only_due_unfinished_transfers():
+    ctrl = object.__new__(LSNPController)
+    ctrl.verbose = False
+    ctrl.transfer_expiry = []
+    ctrl.transfer_expiry_lock = threading.Lock()
+    now = int(time.time())
+    stale = FileTransfer("stale", "a.bin", 1, "application/octet-stream", 1, "alice@10.0.0.1")
+    fresh = FileTransfer("fresh", "b.bin", 1, "application/octet-stream", 1, "alice@10.0.0.1")
+    ctrl.pending_offers = {"stale": stale}
+    ctrl.active_transfers = {"fresh": fresh}
+    for expiry, file_id in ((now - 1, "stale"), (now + TRANSFER_MAX_AGE_SECONDS, "fresh"), (now - 2, "finished")):
+        heapq.heappush(ctrl.transfer_expiry, (expiry, file_id))
+    
+    # "finished" already left both maps, so its entry pops without counting
+    assert ctrl.cleanup_old_transfers() == 1
+    assert ctrl.pending_offers == {}
+    assert ctrl.active_transfers == {"fresh": fresh}
+    assert ctrl.transfer_expiry == [(now + TRANSFER_MAX_AGE_SECONDS, "fresh")]
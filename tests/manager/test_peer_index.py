@@ -0,0 +1,35 @@
+from src.manager.lsnp_controller import LSNPController
+from src.protocol import Peer
+
+def _controller(*peers: Peer) -> LSNPController:
+    ctrl = object.__new__(LSNPController)
+    ctrl.peer_map = {}
+    ctrl.peer_map_by_shortname = {}
+    ctrl.peer_map_by_display_name = {}
+    for peer in peers:
+        ctrl.peer_map[peer.user_id] = peer
+        ctrl._index_peer(peer)
+    return ctrl
+
+def test_rename_moves_the_display_name_entry():
+    alice = Peer("alice@10.0.0.1", "Alice", "10.0.0.1", 50999)
+    ctrl = _controller(alice)
+
+    ctrl._rename_peer(alice, "Ally")
+
+    assert ctrl.peer_map_by_display_name == {"Ally": "alice@10.0.0.1"}
+
+def test_rename_hands_the_old_name_to_a_peer_still_using_it():
+    alice = Peer("alice@10.0.0.1", "Sam", "10.0.0.1", 50999)
+    bob = Peer("bob@10.0.0.2", "Sam", "10.0.0.2", 50999)
+    carol = Peer("carol@10.0.0.3", "Carol", "10.0.0.3", 50999)
+    ctrl = _controller(alice, bob, carol)
+
+    ctrl._rename_peer(alice, "Alice")
+    assert ctrl.peer_map_by_display_name["Sam"] == "bob@10.0.0.2"
+
+    ctrl._rename_peer(carol, "Sam")
+
+    assert ctrl.peer_map_by_display_name["Alice"] == "alice@10.0.0.1"
+    assert ctrl.peer_map_by_display_name["Sam"] == "carol@10.0.0.3"
+    assert "Carol" not in ctrl.peer_map_by_display_name
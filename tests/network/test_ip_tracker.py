@@ -0,0 +1,24 @@
+from src.network.ip_tracker import IPAddressTracker, ip_logger, logger
+
+
+def _traffic_logs():
+  return logger.get_logs(prefix=ip_logger.prefix)
+
+
+def test_quiet_tracker_counts_without_logging_each_packet():
+  ip_logger.set_console_enabled(False)
+  tracker = IPAddressTracker()
+  logger.clear_logs()
+
+  tracker.log_connection_attempt("10.0.0.1", 50999)
+  tracker.log_message_flow("10.0.0.1", "10.0.0.2", "POST", 120)
+
+  assert tracker.connection_attempts["10.0.0.1"] == 1
+  assert _traffic_logs() == []
+
+  tracker.verbose = True
+  tracker.log_connection_attempt("10.0.0.1", 50999)
+  tracker.log_message_flow("10.0.0.1", "10.0.0.2", "POST", 120)
+
+  assert tracker.connection_attempts["10.0.0.1"] == 2
+  assert len(_traffic_logs()) == 2
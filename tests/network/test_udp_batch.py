@@ -0,0 +1,119 @@
+import socket
+import pytest
+from src.network.udp_batch import UDPBatchReceiver, UDPBatchSender
+
+def test_flush_delivers_all_queued_datagrams():
+  receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+  receiver.bind(("127.0.0.1", 0))
+  receiver.settimeout(2)
+  sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+  
+  try:
+    batch = UDPBatchSender(sender)
+    payloads = [f"TYPE: PING\nSEQ: {i}\n\n".encode() for i in range(5)]
+    for payload in payloads:
+      batch.enqueue(payload, receiver.getsockname())
+    
+    assert batch.flush() == len(payloads)
+    assert batch.flush() == 0
+    
+    received = [receiver.recvfrom(4096)[0] for _ in payloads]
+    assert received == payloads
+  finally:
+    sender.close()
+    receiver.close()
+
+def test_full_ring_flushes_before_accepting_more():
+  receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+  receiver.bind(("127.0.0.1", 0))
+  receiver.settimeout(2)
+  sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+  
+  try:
+    batch = UDPBatchSender(sender, capacity=2)
+    payloads = [f"TYPE: PING\nSEQ: {i}\n\n".encode() for i in range(5)]
+    for payload in payloads:
+      batch.enqueue(payload, receiver.getsockname())
+    
+    assert len(batch) == 1
+    assert batch.flush() == 1
+    
+    received = [receiver.recvfrom(4096)[0] for _ in payloads]
+    assert received == payloads
+  finally:
+    sender.close()
+    receiver.close()
+
+def test_failed_datagram_does_not_drop_the_rest_of_the_batch():
+  receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+  receiver.bind(("127.0.0.1", 0))
+  receiver.settimeout(2)
+  sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)   # No SO_BROADCAST, so the broadcast fails with EACCES
+  
+  try:
+    batch = UDPBatchSender(sender)
+    for send in (batch._send_batch, batch._send_each):
+      queued = [(b"ack-1", receiver.getsockname()), (b"broadcast", ("255.255.255.255", 50999)), (b"ack-2", receiver.getsockname())]
+      
+      failures = send(queued)
+      
+      assert [addr for addr, _ in failures] == [("255.255.255.255", 50999)]
+      assert [receiver.recvfrom(4096)[0] for _ in range(2)] == [b"ack-1", b"ack-2"]
+    
+    batch.enqueue(b"ack-1", receiver.getsockname())
+    batch.enqueue(b"broadcast", ("255.255.255.255", 50999))
+    batch.enqueue(b"ack-2", receiver.getsockname())
+    with pytest.raises(OSError, match="1 of 3 datagrams not sent"):
+      batch.flush()
+    assert [receiver.recvfrom(4096)[0] for _ in range(2)] == [b"ack-1", b"ack-2"]
+    assert len(batch) == 0
+  finally:
+    sender.close()
+    receiver.close()
+
+def test_try_enqueue_never_flushes_a_full_ring():
+  sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+  
+  try:
+    batch = UDPBatchSender(sender, capacity=2)
+    assert batch.try_enqueue(b"ack-1", ("127.0.0.1", 50999))
+    assert batch.try_enqueue(b"ack-2", ("127.0.0.1", 50999))
+    assert not batch.try_enqueue(b"ack-3", ("127.0.0.1", 50999))
+    assert len(batch) == 2
+  finally:
+    sender.close()
+
+def test_sockaddr_is_packed_once_per_address():
+  sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+  
+  try:
+    batch = UDPBatchSender(sender)
+    packed = batch._sockaddr(("127.0.0.1", 50999))
+    
+    assert batch._sockaddr(("127.0.0.1", 50999)) is packed
+    assert bytes(packed.sin_addr) == socket.inet_aton("127.0.0.1")
+    assert packed.sin_port == socket.htons(50999)
+  finally:
+    sender.close()
+
+def test_receiver_returns_every_queued_datagram_with_its_sender():
+  receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+  receiver.bind(("127.0.0.1", 0))
+  sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+  sender.bind(("127.0.0.1", 0))
+  
+  try:
+    payloads = [f"TYPE: PING\nSEQ: {i}\n\n".encode() for i in range(4)]
+    for payload in payloads:
+      sender.sendto(payload, receiver.getsockname())
+    
+    batch = UDPBatchReceiver(receiver, 4096)
+    received = []
+    while len(received) < len(payloads):
+      received.extend(batch.recv())
+    
+    assert [data for data, _ in received] == payloads
+    assert all(addr == sender.getsockname() for _, addr in received)
+  finally:
+    sender.close()
+    receiver.close()
@@ -0,0 +1,67 @@
+from src.protocol.types.messages.message_formats import load_avatar, make_ack_message, make_follow_message, make_unfollow_message, make_post_message, make_post_template, make_profile_message, make_tictactoe_move_message, make_tictactoe_move_template
+from src.utils.parsers import format_kv_message
+
+def test_move_template_matches_move_message(monkeypatch):
+    monkeypatch.setattr("time.time", lambda: 1728938500)
+    
+    expected = make_tictactoe_move_message(
+        from_user_id="alice@192.168.1.2",
+        to_user_id="bob@192.168.1.3",
+        gameid="g0",
+        message_id="f83d2b1c",
+        symbol="X",
+        position=4,
+        turn=3,
+        token="alice@192.168.1.2|1728942100|game"
+    )
+    
+    template = make_tictactoe_move_template(
+        from_user_id="alice@192.168.1.2",
+        to_user_id="bob@192.168.1.3",
+        gameid="g0",
+        symbol="X",
+        token="alice@192.168.1.2|1728942100|game"
+    )
+    
+    assert template % (b"f83d2b1c", 4, 3, 1728938500) == expected
+
+def test_move_template_escapes_percent_signs():
+    template = make_tictactoe_move_template("100%@1.1.1.1", "bob@1.1.1.2", "g0", "O", "t|1|game")
+    assert b"FROM: 100%@1.1.1.1\n" in template % (b"id", 0, 1, 0)
+
+def test_ack_message_matches_kv_format():
+    expected = format_kv_message({"TYPE": "ACK", "MESSAGE_ID": "f83d2b1c", "STATUS": "RECEIVED"}).encode()
+    assert make_ack_message("f83d2b1c") == expected
+
+def test_profile_message_reuses_loaded_avatar(tmp_path):
+    avatar_path = tmp_path / "avatar.png"
+    avatar_path.write_bytes(b"\x89PNG")
+    avatar = load_avatar(str(avatar_path))
+    assert avatar == ("image/png", "iVBORw==")
+
+    msg = make_profile_message("Alice", "alice@192.168.1.2", avatar)
+    assert b"AVATAR_TYPE: image/png\nAVATAR_ENCODING: base64\nAVATAR_DATA: iVBORw==\n" in msg
+    assert load_avatar(None) is None
+
+def test_post_template_matches_post_message(monkeypatch):
+    monkeypatch.setattr("time.time", lambda: 1728938500)
+    
+    expected = make_post_message("alice@192.168.1.2", "100% done", 60, "f83d2b1c", "alice@192.168.1.2|1728938560|post")
+    template = make_post_template("alice@192.168.1.2", "100% done", 60, 1728938500, "alice@192.168.1.2|1728938560|post")
+    
+    assert template % (b"f83d2b1c",) == expected
+
+def test_follow_messages_match_kv_format(monkeypatch):
+    monkeypatch.setattr("time.time", lambda: 1728938500)
+    
+    for kind, make in (("FOLLOW", make_follow_message), ("UNFOLLOW", make_unfollow_message)):
+        expected = format_kv_message({
+            "TYPE": kind,
+            "MESSAGE_ID": "f83d2b1c",
+            "FROM": "alice@192.168.1.2",
+            "TO": "bob@192.168.1.3",
+            "TIMESTAMP": 1728938500,
+            "TOKEN": "alice@192.168.1.2|1728942100|follow"
+        }).encode()
+        
+        assert make("alice@192.168.1.2", "bob@192.168.1.3", "f83d2b1c", "alice@192.168.1.2|1728942100|follow") == expected
@@ -0,0 +1,22 @@
+import time
+
+from src.config import TOKEN_TTL
+from src.utils import revoke_token, token_valid_until, validate_token
+
+def test_token_valid_until_reports_expiry():
+    stamp = int(time.time())
+    token = f"alice@10.0.0.1|{stamp}|file"
+    
+    assert token_valid_until(token, "file") == stamp + TOKEN_TTL
+    assert validate_token(token, "file")
+
+def test_token_valid_until_rejects_scope_expiry_and_revocation():
+    stamp = int(time.time())
+    
+    assert token_valid_until(f"alice@10.0.0.1|{stamp}|chat", "file") == 0
+    assert token_valid_until(f"alice@10.0.0.1|{stamp - TOKEN_TTL - 5}|file", "file") == 0
+    assert token_valid_until("not-a-token", "file") == 0
+    
+    revoked = f"bob@10.0.0.2|{stamp}|file"
+    revoke_token(revoked)
+    assert not validate_token(revoked, "file")